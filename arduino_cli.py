@@ -1,25 +1,48 @@
 import subprocess
 import json
+import time
+from metrics import REGISTRY
 
-class ArduinoCLI:
+COMMAND_SECONDS = REGISTRY.histogram("arduino_cli_command_seconds", "Latency of arduino-cli commands.", ["command", "backend"])
+COMMAND_ERRORS = REGISTRY.counter("arduino_cli_command_errors_total", "arduino-cli commands that returned an error.", ["command"])
+PROCESS_SPAWNS = REGISTRY.counter("arduino_cli_process_spawns_total", "arduino-cli processes started.", ["command"])
+OUTPUT_BYTES = REGISTRY.counter("arduino_cli_output_bytes_total", "Bytes of output read from arduino-cli processes.", ["command"])
+
+# Command groups whose second word names the operation (`board listall`, `lib install`, ...).
+_SUBCOMMAND_GROUPS = {"board", "cache", "config", "core", "lib", "outdated", "sketch", "update", "upgrade"}
+
+
+def command_label(command):
+    """Low-cardinality metric label for a command, e.g. "board listall" or "compile"."""
+    if not command:
+        return ""
+    if command[0] in _SUBCOMMAND_GROUPS and len(command) > 1 and not command[1].startswith("-"):
+        return f"{command[0]} {command[1]}"
+    return command[0]
+
+class SubprocessBackend:
     """
-    Python wrapper for Arduino CLI to manage libraries, boards, cores, compile,
-    upload sketches, and export binaries. This version is enhanced to handle
-    JSON output for better integration with web UIs.
+    Runs every command in a fresh arduino-cli process. This is the original
+    behaviour and the fallback for anything the daemon backend cannot serve.
     """
 
+    name = "subprocess"
+
     def __init__(self, cli_path="arduino-cli"):
         self.cli = cli_path
 
-    def _execute(self, command, parse_json=False):
-        """Internal method to execute arduino-cli commands."""
+    def run(self, command, parse_json=False):
+        """Runs a single arduino-cli command and returns its (parsed) output."""
         base_cmd = [self.cli] + command
         if parse_json:
             # Add the format flag for all commands, not just list/search
             base_cmd.append("--format=json")
 
+        label = command_label(command)
+        PROCESS_SPAWNS.inc(command=label)
         try:
             result = subprocess.run(base_cmd, capture_output=True, text=True, check=True, encoding='utf-8')
+            OUTPUT_BYTES.inc(len(result.stdout) + len(result.stderr), command=label)
             
             if parse_json:
                 if not result.stdout.strip():
@@ -28,6 +51,7 @@ class ArduinoCLI:
                 return json.loads(result.stdout)
             return {"success": True, "output": result.stdout + result.stderr}
         except subprocess.CalledProcessError as e:
+            OUTPUT_BYTES.inc(len(e.stdout or "") + len(e.stderr or ""), command=label)
             # If the command fails but produces JSON error output, parse it.
             try:
                 return json.loads(e.stderr)
@@ -38,6 +62,53 @@ class ArduinoCLI:
         except FileNotFoundError:
             return {"error": True, "message": f"The command '{self.cli}' was not found. Please ensure arduino-cli is installed and in your system's PATH."}
 
+    def close(self):
+        pass
+
+
+class ArduinoCLI:
+    """
+    Python wrapper for Arduino CLI to manage libraries, boards, cores, compile,
+    upload sketches, and export binaries. This version is enhanced to handle
+    JSON output for better integration with web UIs.
+    """
+
+    def __init__(self, cli_path="arduino-cli", backend="subprocess"):
+        self.cli = cli_path
+        self.subprocess = SubprocessBackend(cli_path)
+        if backend == "daemon":
+            # Imported lazily so grpcio stays an optional dependency.
+            from arduino_daemon import DaemonBackend
+            self.backend = DaemonBackend(cli_path, fallback=self.subprocess)
+        else:
+            self.backend = self.subprocess
+        self._change_listeners = []
+
+    def add_change_listener(self, listener):
+        """
+        Registers `listener(*topics)` to be called after a command that changes
+        installed state. Topics are "sketches", "boards", "cores" and "libraries".
+        """
+        self._change_listeners.append(listener)
+
+    def _notify(self, *topics):
+        for listener in self._change_listeners:
+            listener(*topics)
+
+    def _execute(self, command, parse_json=False):
+        """Internal method to execute arduino-cli commands through the active backend."""
+        label = command_label(command)
+        start = time.perf_counter()
+        result = self.backend.run(command, parse_json=parse_json)
+        COMMAND_SECONDS.observe(time.perf_counter() - start, command=label, backend=self.backend.name)
+        if isinstance(result, dict) and result.get("error"):
+            COMMAND_ERRORS.inc(command=label)
+        return result
+
+    def close(self):
+        """Stops any long-lived process owned by the backend."""
+        self.backend.close()
+
     # =================== Sketch Management (JSON) ===================
 
     def sketch_list(self):
@@ -45,7 +116,9 @@ class ArduinoCLI:
     
     def sketch_new(self, name):
         # The `new` command doesn't support JSON output, so we handle its text.
-        return self._execute(["sketch", "new", name])
+        result = self._execute(["sketch", "new", name])
+        self._notify("sketches")
+        return result
 
     # =================== Core & Board Management (JSON) ===================
 
@@ -55,6 +128,9 @@ class ArduinoCLI:
     def board_list_all(self):
         return self._execute(["board", "listall"], parse_json=True)
 
+    def board_details(self, fqbn):
+        return self._execute(["board", "details", "-b", fqbn], parse_json=True)
+
     def board_list_connected(self):
         return self._execute(["board", "list"], parse_json=True)
 
@@ -69,15 +145,64 @@ class ArduinoCLI:
     # =================== Installation & Execution ===================
 
     def core_update_index(self):
-        return self._execute(["core", "update-index"])
+        result = self._execute(["core", "update-index"])
+        self._notify("boards", "cores")
+        return result
+
+    def core_install(self, name):
+        result = self._execute(["core", "install", name])
+        self._notify("boards", "cores")
+        return result
+
+    def core_uninstall(self, name):
+        result = self._execute(["core", "uninstall", name])
+        self._notify("boards", "cores")
+        return result
 
     def lib_install(self, name):
-        return self._execute(["lib", "install", name])
+        result = self._execute(["lib", "install", name])
+        self._notify("libraries")
+        return result
 
-    def compile(self, fqbn, sketch_path):
-        # Compile now requires the full path to the sketch directory
-        return self._execute(["compile", "--fqbn", fqbn, sketch_path])
+    def compile(self, fqbn, sketch_path, build_path=None, build_cache_path=None):
+        return self._execute(self.compile_args(fqbn, sketch_path, build_path, build_cache_path))
+
+    def upload(self, fqbn, sketch_path, port, input_dir=None):
+        return self._execute(self.upload_args(fqbn, sketch_path, port, input_dir))
 
-    def upload(self, fqbn, sketch_path, port):
+    def compile_args(self, fqbn, sketch_path, build_path=None, build_cache_path=None):
+        # Compile now requires the full path to the sketch directory
+        args = ["compile", "--fqbn", fqbn]
+        if build_path:
+            args += ["--build-path", str(build_path)]
+        if build_cache_path:
+            args += ["--build-cache-path", str(build_cache_path)]
+        return args + [sketch_path]
+
+    def upload_args(self, fqbn, sketch_path, port, input_dir=None):
         # Upload also requires the full path
-        return self._execute(["upload", "-p", port, "--fqbn", fqbn, sketch_path])
+        args = ["upload", "-p", port, "--fqbn", fqbn]
+        if input_dir:
+            # Binaries built outside the sketch's default build path.
+            args += ["--input-dir", str(input_dir)]
+        return args + [sketch_path]
+
+    def stream(self, command):
+        """
+        Starts a command without waiting for it and returns the Popen handle.
+        stderr is merged into stdout so build output can be read line by line
+        while the toolchain runs. Always uses a subprocess, whatever the backend.
+        """
+        PROCESS_SPAWNS.inc(command=command_label(command))
+        return subprocess.Popen(
+            [self.cli] + command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding='utf-8', errors='replace', bufsize=1,
+        )
+
+    def record_stream(self, command, seconds, output_bytes, failed):
+        """Records a finished stream() command under the same metrics and labels as `_execute`."""
+        label = command_label(command)
+        COMMAND_SECONDS.observe(seconds, command=label, backend=self.subprocess.name)
+        OUTPUT_BYTES.inc(output_bytes, command=label)
+        if failed:
+            COMMAND_ERRORS.inc(command=label)
@@ -0,0 +1,297 @@
+import atexit
+import importlib
+import socket
+import subprocess
+import threading
+import time
+
+from arduino_cli import PROCESS_SPAWNS
+
+try:
+    import grpc
+    from google.protobuf import json_format
+except ImportError:  # grpcio/protobuf are optional; without them we always fall back.
+    grpc = None
+    json_format = None
+
+
+class DaemonBackend:
+    """
+    Serves arduino-cli operations from one long-lived `arduino-cli daemon`
+    process over a reused local gRPC channel, instead of forking a new CLI
+    (and re-loading every index) per call.
+
+    The daemon only speaks gRPC, so this backend needs `grpcio`, `protobuf`
+    and the Python stubs generated from arduino-cli's `rpc/` protos (importable
+    as `stubs_module`). Commands without an RPC mapping, or any call made while
+    the daemon is unavailable, are transparently sent to `fallback`.
+    """
+
+    name = "daemon"
+
+    # Commands that change what is installed; the daemon instance has to
+    # re-load its indexes after we run one of them through the fallback.
+    REINIT_COMMANDS = {
+        ("core", "update-index"), ("core", "install"), ("core", "uninstall"),
+        ("core", "upgrade"), ("lib", "install"), ("lib", "uninstall"),
+        ("lib", "upgrade"), ("lib", "update-index"), ("update",),
+    }
+
+    def __init__(self, cli_path, fallback, port=None,
+                 stubs_module="cc.arduino.cli.commands.v1",
+                 startup_timeout=15.0, init_timeout=120.0, health_interval=10.0):
+        self.cli = cli_path
+        self.fallback = fallback
+        self.port = port
+        self.stubs_module = stubs_module
+        self.startup_timeout = startup_timeout
+        self.init_timeout = init_timeout
+        self.health_interval = health_interval
+
+        self._lock = threading.RLock()
+        self._process = None
+        self._channel = None
+        self._stub = None
+        self._instance = None
+        self._pb = None
+        self._stopped = threading.Event()
+        self._supervisor = None
+        self._retry_at = 0.0
+        # Set while a (re)start or re-init loads the indexes; calls use the
+        # fallback meanwhile instead of waiting for it.
+        self._busy = False
+        self.restarts = 0
+
+        self._handlers = {
+            ("board", "listall"): self._board_list_all,
+            ("board", "list"): self._board_list,
+            ("core", "list"): self._core_list,
+            ("lib", "list"): self._lib_list,
+            ("lib", "search"): self._lib_search,
+        }
+
+        if self._load_stubs():
+            atexit.register(self.close)
+            self._supervisor = threading.Thread(target=self._supervise, name="arduino-daemon-supervisor", daemon=True)
+            self._supervisor.start()
+
+    # =================== Backend Interface ===================
+
+    def run(self, command, parse_json=False):
+        handler = self._handlers.get(tuple(command[:2])) if parse_json else None
+        session = self._session() if handler is not None else None
+        if session is None:
+            result = self.fallback.run(command, parse_json=parse_json)
+            if self._is_reinit_command(command) and self._stub is not None:
+                self._reinit()
+            return result
+
+        # The supervisor may tear the connection down at any moment, so the
+        # handler works on the stub and instance it was given; if they die
+        # under it the request is answered the old way.
+        stub, instance = session
+        try:
+            return handler(stub, instance, command[2:])
+        except Exception as e:
+            if grpc is not None and isinstance(e, grpc.RpcError) and e.code() == grpc.StatusCode.UNAVAILABLE:
+                self._mark_dead()  # Restarted by the next call or the supervisor.
+            return self.fallback.run(command, parse_json=parse_json)
+
+    def close(self):
+        self._stopped.set()
+        with self._lock:
+            self._shutdown()
+
+    # =================== Process Supervision ===================
+
+    def ensure_running(self):
+        """Starts the daemon if needed. Returns False when it cannot be used."""
+        return self._session() is not None
+
+    def _session(self):
+        """(stub, instance) of a running daemon, starting it if needed, or None."""
+        if self._pb is None or self._stopped.is_set():
+            return None
+        with self._lock:
+            if self._busy:
+                return None
+            if self._alive():
+                return self._stub, self._instance
+            if time.monotonic() < self._retry_at:
+                return None  # Recently failed to start; keep using the fallback for now.
+            self._busy = True
+
+        started = False
+        try:
+            started = self._start()
+        finally:
+            with self._lock:
+                self._busy = False
+                if not started:
+                    self._retry_at = time.monotonic() + self.health_interval
+        with self._lock:
+            return (self._stub, self._instance) if started and self._alive() else None
+
+    def _alive(self):
+        # Caller holds self._lock.
+        return self._stub is not None and self._process is not None and self._process.poll() is None
+
+    def healthy(self):
+        with self._lock:
+            if self._process is None or self._process.poll() is not None or self._channel is None:
+                return False
+            channel = self._channel
+        return _wait_ready(channel, timeout=2.0)
+
+    def _supervise(self):
+        while not self._stopped.wait(self.health_interval):
+            if self._stub is not None and not self.healthy():
+                self._mark_dead()
+                self.ensure_running()
+
+    def _start(self):
+        """Starts a daemon and loads its indexes without holding the lock; True once it serves calls."""
+        self._mark_dead()
+        port = self.port or _free_port()
+        try:
+            PROCESS_SPAWNS.inc(command="daemon")
+            process = subprocess.Popen(
+                [self.cli, "daemon", "--port", str(port)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError:
+            self._pb = None  # No CLI at all; never try again.
+            return False
+
+        channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+        try:
+            if not _wait_ready(channel, self.startup_timeout):
+                raise TimeoutError
+            stub = self._pb.grpc.ArduinoCoreServiceStub(channel)
+            instance = stub.Create(self._pb.messages.CreateRequest(), timeout=self.startup_timeout).instance
+            self._init_instance(stub, instance)
+        except (TimeoutError, grpc.RpcError):
+            _discard(process, channel)
+            return False
+
+        with self._lock:
+            if self._stopped.is_set():
+                _discard(process, channel)
+                return False
+            self._process, self._channel, self._stub, self._instance = process, channel, stub, instance
+            self.restarts += 1
+        return True
+
+    def _init_instance(self, stub, instance):
+        # Init streams progress messages; draining it waits for the indexes to load.
+        for _ in stub.Init(self._pb.messages.InitRequest(instance=instance), timeout=self.init_timeout):
+            pass
+
+    def _reinit(self):
+        with self._lock:
+            if self._busy or not self._alive():
+                return
+            self._busy = True
+            stub, instance = self._stub, self._instance
+        try:
+            self._init_instance(stub, instance)
+            failed = False
+        except grpc.RpcError:
+            failed = True
+        finally:
+            with self._lock:
+                self._busy = False
+        if failed:
+            self._mark_dead()
+
+    def _mark_dead(self):
+        with self._lock:
+            self._shutdown()
+
+    def _shutdown(self):
+        _discard(self._process, self._channel)
+        self._process = self._channel = self._stub = self._instance = None
+
+    def _load_stubs(self):
+        if grpc is None:
+            return False
+        try:
+            self._pb = _Stubs(
+                importlib.import_module(f"{self.stubs_module}.commands_pb2"),
+                importlib.import_module(f"{self.stubs_module}.commands_pb2_grpc"),
+            )
+        except ImportError:
+            self._pb = None
+        return self._pb is not None
+
+    def _is_reinit_command(self, command):
+        return tuple(command[:2]) in self.REINIT_COMMANDS or tuple(command[:1]) in self.REINIT_COMMANDS
+
+    # =================== RPC Handlers ===================
+    # Each handler returns a dict shaped like the matching `--format=json` output.
+
+    def _to_dict(self, message):
+        return json_format.MessageToDict(message, preserving_proto_field_name=True)
+
+    def _board_list_all(self, stub, instance, args):
+        request = self._pb.messages.BoardListAllRequest(instance=instance, search_args=args)
+        return self._to_dict(stub.BoardListAll(request))
+
+    def _board_list(self, stub, instance, args):
+        request = self._pb.messages.BoardListRequest(instance=instance)
+        return {"detected_ports": self._to_dict(stub.BoardList(request)).get("ports", [])}
+
+    def _core_list(self, stub, instance, args):
+        request = self._pb.messages.PlatformSearchRequest(instance=instance)
+        platforms = []
+        for summary in self._to_dict(stub.PlatformSearch(request)).get("search_output", []):
+            if not summary.get("installed_version"):
+                continue
+            platforms.append({
+                **summary.get("metadata", {}),
+                "installed_version": summary["installed_version"],
+                "latest_version": summary.get("latest_version"),
+                "releases": summary.get("releases", {}),
+            })
+        return {"platforms": platforms}
+
+    def _lib_list(self, stub, instance, args):
+        request = self._pb.messages.LibraryListRequest(instance=instance)
+        return self._to_dict(stub.LibraryList(request))
+
+    def _lib_search(self, stub, instance, args):
+        request = self._pb.messages.LibrarySearchRequest(instance=instance, search_args=" ".join(args))
+        return self._to_dict(stub.LibrarySearch(request))
+
+
+class _Stubs:
+    def __init__(self, messages, grpc_module):
+        self.messages = messages
+        self.grpc = grpc_module
+
+
+def _discard(process, channel):
+    if channel is not None:
+        channel.close()
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _wait_ready(channel, timeout):
+    future = grpc.channel_ready_future(channel)
+    try:
+        future.result(timeout=timeout)
+        return True
+    except grpc.FutureTimeoutError:
+        future.cancel()  # Otherwise it keeps polling the channel after we close it.
+        return False
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
@@ -0,0 +1,95 @@
+"""
+Compares library search latency of the in-memory LibraryIndex with the
+`arduino-cli lib search` path it replaces.
+
+    python benchmarks/bench_library_search.py [--index PATH] [--cli arduino-cli]
+
+Without --index a synthetic library_index.json is generated. The CLI side is
+skipped when the executable cannot be found.
+"""
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from arduino_cli import ArduinoCLI  # noqa: E402
+from library_index import LibraryIndex  # noqa: E402
+
+QUERIES = ["servo", "ada", "wifi", "neo pixel", "temp sens", "lcd", "mqtt", "st", "json", "bluetooth le"]
+WORDS = ("servo motor sensor wifi display lcd oled led strip neo pixel temperature humidity gps radio "
+         "bluetooth ble can bus modbus json mqtt http audio sd card rtc clock keypad stepper encoder").split()
+
+
+def synthetic_index(path, count):
+    rng = random.Random(0)
+    releases = []
+    for i in range(count):
+        name = "".join(word.title() for word in rng.sample(WORDS, 2)) + str(i)
+        for version in ("1.0.0", "1.2.0", "1.10.0"):
+            releases.append({
+                "name": name, "version": version,
+                "author": rng.choice(["Adafruit", "SparkFun", "Arduino", "Paul Stoffregen"]),
+                "maintainer": "maintainer", "sentence": " ".join(rng.sample(WORDS, 6)),
+                "paragraph": " ".join(rng.sample(WORDS, 20)),
+                "category": rng.choice(["Sensors", "Display", "Communication", "Device Control"]),
+            })
+    path.write_text(json.dumps({"libraries": releases}), encoding="utf-8")
+
+
+def measure(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            payload = fn(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": statistics.median(samples),
+        "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "mean_ms": statistics.fmean(samples),
+        "last_payload_bytes": len(json.dumps(payload)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", type=Path, help="library_index.json to load (default: synthetic)")
+    parser.add_argument("--libraries", type=int, default=6000, help="libraries in the synthetic index")
+    parser.add_argument("--cli", default="arduino-cli", help="arduino-cli executable for the baseline")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--cli-rounds", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = args.index
+        if index_path is None:
+            index_path = Path(tmp) / "library_index.json"
+            synthetic_index(index_path, args.libraries)
+
+        index = LibraryIndex(index_path)
+        start = time.perf_counter()
+        index.available()
+        print(f"index load: {(time.perf_counter() - start) * 1000:.1f} ms ({len(index.libraries)} libraries)")
+
+        results = {"index": measure(lambda q: index.search(q), args.rounds)}
+        if shutil.which(args.cli):
+            cli = ArduinoCLI(args.cli)
+            results["cli"] = measure(cli.lib_search, args.cli_rounds)
+        else:
+            print(f"'{args.cli}' not found; skipping the CLI baseline.")
+
+    for name, stats in results.items():
+        print(f"{name:>6}: p50 {stats['p50_ms']:9.2f} ms  p99 {stats['p99_ms']:9.2f} ms  "
+              f"mean {stats['mean_ms']:9.2f} ms  payload {stats['last_payload_bytes']} B")
+
+
+if __name__ == "__main__":
+    main()
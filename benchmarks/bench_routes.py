@@ -0,0 +1,156 @@
+"""
+Route throughput and latency benchmark against the fake arduino-cli.
+
+    python benchmarks/bench_routes.py [--clients 8] [--requests 200] [--delay 0.05] [--ttl 300]
+
+Measures cold start (import and first request in a fresh interpreter), then
+serves the app on a local threaded server and hits each route from
+concurrent clients, reporting throughput and p50/p99 latency. Use --ttl 0 to
+disable the metadata cache and see the cost of the CLI calls themselves.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_library_search import synthetic_index  # noqa: E402
+
+ROUTES = [
+    "/api/sketches",
+    "/api/boards",
+    "/api/boards/catalog?vendor=arduino&limit=50",
+    "/api/boards/search?prefix=esp",
+    "/api/cores/installed",
+    "/api/libraries/installed",
+    "/api/libraries/search?query=servo",
+    "/api/sketch/workspace?path={sketch}",
+    "/metrics",
+]
+
+COLD_START = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.app.test_client().get('/api/sketches')
+print(json.dumps({"import_s": imported - start, "first_request_s": time.perf_counter() - imported}))
+"""
+
+
+def fake_environment(root, args):
+    """Writes a fake arduino-cli, sketchbook and data dir under `root`; returns the env to use."""
+    bin_dir, sketchbook, data_dir = root / "bin", root / "sketchbook", root / "data"
+    for directory in (bin_dir, sketchbook / "Bench", data_dir):
+        directory.mkdir(parents=True, exist_ok=True)
+    for i in range(args.files):
+        (sketchbook / "Bench" / (f"tab{i}.h" if i else "Bench.ino")).write_text("// bench\n" * 200, encoding="utf-8")
+    synthetic_index(data_dir / "library_index.json", 2000)
+
+    wrapper = bin_dir / "arduino-cli"
+    wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{BENCH_DIR / "fake_arduino_cli.py"}" "$@"\n', encoding="utf-8")
+    wrapper.chmod(0o755)
+
+    return {
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "FAKE_CLI_DELAY": str(args.delay),
+        "FAKE_CLI_BOARDS": str(args.boards),
+        "FAKE_CLI_SKETCHBOOK": str(sketchbook),
+        "FAKE_CLI_DATA": str(data_dir),
+        "METADATA_CACHE_TTL": str(args.ttl),
+        "BUILD_CACHE_DIR": str(root / "build-cache"),
+    }, sketchbook / "Bench"
+
+
+def cold_start(env):
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_START], cwd=REPO_DIR, env={**os.environ, **env},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def bench_route(port, path, clients, requests):
+    local = threading.local()
+
+    def fetch(_):
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        start = time.perf_counter()
+        local.conn.request("GET", path)
+        response = local.conn.getresponse()
+        body = response.read()
+        return time.perf_counter() - start, response.status, len(body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(fetch, range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for latency, _, _ in results)
+    return {
+        "route": path,
+        "rps": requests / wall,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 0.99),
+        "errors": sum(1 for _, status, _ in results if status >= 400),
+        "bytes": results[-1][2],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--delay", type=float, default=0.05, help="fake CLI delay per command (s)")
+    parser.add_argument("--boards", type=int, default=500)
+    parser.add_argument("--files", type=int, default=5, help="files in the benchmark sketch")
+    parser.add_argument("--ttl", type=float, default=300, help="METADATA_CACHE_TTL (0 disables caching)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env, sketch = fake_environment(Path(tmp), args)
+        startup = cold_start(env)
+
+        os.environ.update(env)
+        from werkzeug.serving import make_server
+        import main as app_module
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)  # No per-request access log.
+
+        server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            results = [bench_route(server.server_port, route.format(sketch=sketch.as_posix()), args.clients, args.requests) for route in ROUTES]
+        finally:
+            server.shutdown()
+
+    if args.json:
+        print(json.dumps({"cold_start": startup, "routes": results}, indent=2))
+        return
+    print(f"cold start: import {startup['import_s'] * 1000:.0f} ms, first request {startup['first_request_s'] * 1000:.0f} ms")
+    print(f"{'route':<48} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7} {'bytes':>9}")
+    for r in results:
+        print(f"{r['route'][:48]:<48} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>7} {r['bytes']:>9}")
+
+
+if __name__ == "__main__":
+    main()
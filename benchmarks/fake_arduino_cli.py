@@ -0,0 +1,107 @@
+"""
+Stand-in for `arduino-cli` used by the benchmarks. It answers the commands
+the app issues with plausible JSON after a configurable delay, so route
+overhead can be measured without real cores or boards.
+
+Environment:
+    FAKE_CLI_DELAY           seconds every command takes (default 0.05)
+    FAKE_CLI_COMPILE_DELAY   seconds a compile/upload takes (default 1.0)
+    FAKE_CLI_BOARDS          boards returned by `board listall` (default 500)
+    FAKE_CLI_LIBRARIES       libraries returned by `lib list` (default 50)
+    FAKE_CLI_SKETCHBOOK      directories.user
+    FAKE_CLI_DATA            directories.data
+"""
+import json
+import os
+import sys
+import time
+
+
+def env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def boards(count):
+    platforms = [("arduino", "avr", "Arduino"), ("arduino", "samd", "Arduino"), ("esp32", "esp32", "Espressif Systems")]
+    result = []
+    for i in range(count):
+        vendor, arch, maintainer = platforms[i % len(platforms)]
+        result.append({
+            "name": f"{maintainer} Board {i}",
+            "fqbn": f"{vendor}:{arch}:board{i}",
+            "platform": {"metadata": {"id": f"{vendor}:{arch}", "maintainer": maintainer}, "release": {"version": "1.0.0"}},
+        })
+    return {"boards": result}
+
+
+def main(argv):
+    args = [arg for arg in argv if not arg.startswith("--format")]
+    sketchbook = os.environ.get("FAKE_CLI_SKETCHBOOK", os.getcwd())
+    data_dir = os.environ.get("FAKE_CLI_DATA", os.getcwd())
+    time.sleep(env_float("FAKE_CLI_DELAY", 0.05))
+
+    def emit(payload):
+        print(json.dumps(payload))
+
+    head = tuple(args[:2])
+    if args[:3] == ["config", "get", "directories.user"]:
+        print(sketchbook)
+    elif args[:3] == ["config", "get", "directories.data"]:
+        print(data_dir)
+    elif head == ("config", "dump"):
+        emit({"directories": {"user": sketchbook, "data": data_dir}})
+    elif head == ("sketch", "list"):
+        sketches = [{"name": entry.name, "path": entry.path} for entry in os.scandir(sketchbook) if entry.is_dir()]
+        emit({"sketchbooks": [{"sketches": sketches}]})
+    elif head == ("sketch", "new"):
+        os.makedirs(args[2], exist_ok=True)
+        print(f"Sketch created in: {args[2]}")
+    elif head == ("board", "listall"):
+        emit(boards(int(os.environ.get("FAKE_CLI_BOARDS", 500))))
+    elif head == ("board", "details"):
+        emit({"fqbn": args[-1], "config_options": [{"option": "cpu", "values": [{"value": "default", "selected": True}]}]})
+    elif head == ("board", "list"):
+        if "--watch" in args:
+            sys.stdout.flush()
+            time.sleep(3600)
+        emit({"detected_ports": []})
+    elif head == ("core", "list"):
+        emit({"platforms": [
+            {"id": "arduino:avr", "maintainer": "Arduino", "installed_version": "1.0.0"},
+            {"id": "arduino:samd", "maintainer": "Arduino", "installed_version": "1.0.0"},
+            {"id": "esp32:esp32", "maintainer": "Espressif Systems", "installed_version": "1.0.0"},
+        ]})
+    elif head == ("lib", "list"):
+        count = int(os.environ.get("FAKE_CLI_LIBRARIES", 50))
+        emit({"installed_libraries": [{"library": {"name": f"Library{i}", "version": "1.0.0", "author": "Bench"}} for i in range(count)]})
+    elif head == ("lib", "search"):
+        emit({"libraries": [{"name": args[2], "latest": {"version": "1.0.0", "sentence": "Benchmark library"}}]})
+    elif args and args[0] in ("compile", "upload"):
+        steps = 5
+        for step in range(steps):
+            print(f"{args[0]} step {step + 1}/{steps}", flush=True)
+            time.sleep(env_float("FAKE_CLI_COMPILE_DELAY", 1.0) / steps)
+        sketch_name = os.path.basename(os.path.normpath(args[-1]))
+        if args[0] == "compile":
+            if "--build-path" in args:
+                build_path = args[args.index("--build-path") + 1]
+                with open(os.path.join(build_path, f"{sketch_name}.ino.hex"), "w", encoding="utf-8") as hex_file:
+                    hex_file.write(":00000001FF\n")
+            print("Sketch uses 924 bytes (2%) of program storage space. Maximum is 32256 bytes.")
+            print("Global variables use 9 bytes (0%) of dynamic memory, leaving 2039 bytes for local variables. Maximum is 2048 bytes.")
+        elif "--input-dir" in args:
+            input_dir = args[args.index("--input-dir") + 1]
+            if not os.path.isfile(os.path.join(input_dir, f"{sketch_name}.ino.hex")):
+                print(f"Error during Upload: compiled sketch not found in {input_dir}", file=sys.stderr)
+                return 1
+            print(f"Uploading {input_dir}")
+    elif head in (("lib", "install"), ("core", "install"), ("core", "uninstall"), ("core", "update-index")):
+        print("ok")
+    else:
+        print(f"fake arduino-cli: unsupported command {args}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
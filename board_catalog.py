@@ -0,0 +1,162 @@
+import bisect
+import hashlib
+import re
+import threading
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _platform_id(board):
+    """`vendor:arch` of a `board listall` entry, across arduino-cli JSON layouts."""
+    platform = board.get("platform") or {}
+    platform_id = (platform.get("metadata") or {}).get("id") or platform.get("id")
+    if platform_id:
+        return platform_id
+    return ":".join(board.get("fqbn", "").split(":")[:2])
+
+
+class BoardCatalog:
+    """
+    Compact, indexed view of every installed board.
+
+    Built from `board listall` and `core list`, keyed by the set of installed
+    platform versions: when a core is added, removed or upgraded only that
+    platform's boards are re-read and its cached details dropped. Boards are
+    indexed by FQBN, vendor and architecture, and name/FQBN tokens are kept
+    sorted for prefix search.
+
+    `load_boards(fresh=True)` must bypass any cached listing: it is asked for
+    whenever the installed platforms change, so boards and cores can't come
+    from listings of different ages.
+    """
+
+    def __init__(self, load_boards, load_cores, load_details):
+        self._load_boards = load_boards
+        self._load_cores = load_cores
+        self._load_details = load_details
+        self._lock = threading.Lock()
+        self._platforms = {}  # platform id -> installed version
+        self._by_platform = {}  # platform id -> [board records]
+        self._details = {}
+        self.version = None
+        self.by_fqbn = {}
+        self.by_vendor = {}
+        self.by_arch = {}
+        self._tokens = []
+
+    # =================== Building ===================
+
+    def refresh(self):
+        """Brings the catalog in line with the installed cores; cheap when nothing changed."""
+        cores = self._load_cores()
+        if cores.get("error"):
+            return self.version  # Keep serving what we have rather than dropping every board.
+        installed = {p.get("id"): p.get("installed_version") for p in cores.get("platforms") or [] if p.get("id")}
+        with self._lock:
+            if installed == self._platforms and self.version is not None:
+                return self.version
+            first_build = self.version is None
+            changed = {pid for pid, version in installed.items() if self._platforms.get(pid) != version}
+            removed = set(self._platforms) - set(installed)
+
+            boards = []
+            if changed or first_build:
+                listing = self._load_boards(fresh=True)
+                if listing.get("error"):
+                    # Leave the installed set alone so the next call retries.
+                    return self.version
+                boards = listing.get("boards") or []
+
+            for platform_id in removed | changed:
+                self._by_platform.pop(platform_id, None)
+                for fqbn in [fqbn for fqbn in self._details if _platform_id({"fqbn": fqbn}) == platform_id]:
+                    del self._details[fqbn]
+
+            if first_build:
+                self._by_platform = {}
+            for board in boards:
+                platform_id = _platform_id(board)
+                if board.get("fqbn") and (first_build or platform_id in changed):
+                    self._by_platform.setdefault(platform_id, []).append(self._record(board, platform_id, installed))
+
+            self._platforms = installed
+            self._reindex()
+            return self.version
+
+    def _record(self, board, platform_id, installed):
+        vendor, _, arch = platform_id.partition(":")
+        return {
+            "fqbn": board["fqbn"],
+            "name": board.get("name", board["fqbn"]),
+            "vendor": vendor,
+            "arch": arch,
+            "platform": platform_id,
+            "version": installed.get(platform_id),
+        }
+
+    def _reindex(self):
+        by_fqbn, by_vendor, by_arch, tokens = {}, {}, {}, set()
+        for platform_id in sorted(self._by_platform):
+            for record in self._by_platform[platform_id]:
+                by_fqbn[record["fqbn"]] = record
+                by_vendor.setdefault(record["vendor"].lower(), []).append(record)
+                by_arch.setdefault(record["arch"].lower(), []).append(record)
+                for token in _TOKEN_RE.findall(f"{record['name']} {record['fqbn']}".lower()):
+                    tokens.add((token, record["fqbn"]))
+        self.by_fqbn, self.by_vendor, self.by_arch = by_fqbn, by_vendor, by_arch
+        self._tokens = sorted(tokens)
+        state = ",".join(f"{pid}@{version}" for pid, version in sorted(self._platforms.items()))
+        self.version = hashlib.sha1(state.encode("utf-8")).hexdigest()[:16]
+
+    # =================== Queries ===================
+
+    def query(self, vendor=None, arch=None, text=None, offset=0, limit=None):
+        """Boards filtered by vendor, architecture and a case-insensitive name/FQBN substring."""
+        self.refresh()
+        if vendor:
+            boards = self.by_vendor.get(vendor.lower(), [])
+        elif arch:
+            boards = self.by_arch.get(arch.lower(), [])
+        else:
+            boards = list(self.by_fqbn.values())
+        if vendor and arch:
+            boards = [b for b in boards if b["arch"].lower() == arch.lower()]
+        if text:
+            needle = text.lower()
+            boards = [b for b in boards if needle in b["name"].lower() or needle in b["fqbn"].lower()]
+        boards = sorted(boards, key=lambda b: (b["name"].lower(), b["fqbn"]))
+        end = None if limit is None else offset + limit
+        return {"version": self.version, "total": len(boards), "boards": boards[offset:end]}
+
+    def search(self, prefix, limit=20):
+        """Boards with a name or FQBN token starting with every word of `prefix`."""
+        self.refresh()
+        tokens, by_fqbn = self._tokens, self.by_fqbn
+        words = _TOKEN_RE.findall(prefix.lower())
+        matches = None
+        for word in words:
+            fqbns = set()
+            start = bisect.bisect_left(tokens, (word, ""))
+            for token, fqbn in tokens[start:]:
+                if not token.startswith(word):
+                    break
+                fqbns.add(fqbn)
+            matches = fqbns if matches is None else matches & fqbns
+        boards = sorted((by_fqbn[fqbn] for fqbn in matches or () if fqbn in by_fqbn), key=lambda b: (b["name"].lower(), b["fqbn"]))
+        return {"version": self.version, "total": len(boards), "boards": boards[:limit]}
+
+    def details(self, fqbn):
+        """Compact record plus `board details` (config options, programmers), or None if unknown."""
+        self.refresh()
+        # Config options may be appended to an FQBN; the board itself is vendor:arch:id.
+        record = self.by_fqbn.get(":".join(fqbn.split(":")[:3]))
+        if record is None:
+            return None
+        with self._lock:
+            details = self._details.get(fqbn)
+        if details is None:
+            details = self._load_details(fqbn)
+            if not details.get("error"):
+                with self._lock:
+                    self._details[fqbn] = details
+        return {**record, "details": details}
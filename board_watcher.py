@@ -0,0 +1,160 @@
+import json
+import threading
+from collections import deque
+
+from arduino_cli import COMMAND_ERRORS, OUTPUT_BYTES, command_label
+
+
+def cli_watch_source(cli):
+    """
+    Default event source: a single long-running `board list --watch` whose
+    JSON lines are yielded as dicts. Closing the stream kills the process.
+    """
+    return lambda: _WatchStream(cli)
+
+
+class _WatchStream:
+    COMMAND = ["board", "list", "--watch", "--format", "jsonmini"]
+
+    def __init__(self, cli):
+        self.label = command_label(self.COMMAND)
+        self.process = cli.stream(self.COMMAND)
+        self.killed = False
+
+    def __iter__(self):
+        for line in self.process.stdout:
+            OUTPUT_BYTES.inc(len(line), command=self.label)
+            line = line.strip()
+            if line.startswith("{"):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def close(self):
+        # Safe from any thread; a reader blocked on stdout then sees EOF.
+        if self.process.poll() is None:
+            self.killed = True
+            self.process.kill()
+        elif self.process.returncode != 0 and not self.killed:
+            COMMAND_ERRORS.inc(command=self.label)  # The watch died on its own.
+        self.process.wait()
+
+
+def _port_key(port):
+    return f"{port.get('protocol', 'serial')}://{port.get('address', '')}"
+
+
+class BoardWatcher:
+    """
+    Keeps an in-memory registry of connected ports and detected boards, fed by
+    one long-lived discovery stream instead of a `board list` per request.
+
+    `source()` must return an iterable of arduino-cli watch events
+    ({"eventType": "add"|"remove", "port": {...}, "matching_boards": [...]});
+    it is restarted with a delay if it ends. If the iterable has a `close()`
+    that works from another thread, `stop()` uses it to end a blocked read.
+    Changes are appended to a short numbered log that subscribers follow
+    with `wait()`.
+    """
+
+    def __init__(self, source, log_size=256, restart_delay=2.0):
+        self.source = source
+        self.restart_delay = restart_delay
+        self.ports = {}
+        self.last_error = None
+        self._log = deque(maxlen=log_size)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._events = None
+
+    def start(self):
+        """Starts the watcher thread once; safe to call on every request."""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="board-watcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stopped.set()
+        with self._cond:
+            events, thread = self._events, self._thread
+        if hasattr(events, "close"):
+            try:
+                events.close()
+            except ValueError:
+                pass  # A generator can't be closed while it runs; it ends on its next event.
+        if thread is not None:
+            thread.join(timeout)
+
+    def snapshot(self):
+        with self._cond:
+            return {"seq": self._seq, "ports": list(self.ports.values()), "error": self.last_error}
+
+    def wait(self, after_seq, timeout=15.0):
+        """
+        Returns (seq, events) for changes after `after_seq`, waiting up to
+        `timeout` for one. `events` is None when the caller fell further behind
+        than the log keeps and must re-read the snapshot.
+        """
+        with self._cond:
+            if self._seq <= after_seq:
+                self._cond.wait(timeout)
+            if self._seq > after_seq and (not self._log or self._log[0][0] > after_seq + 1):
+                return self._seq, None
+            return self._seq, [event for seq, event in self._log if seq > after_seq]
+
+    def _emit(self, event):
+        # Caller holds self._cond.
+        self._seq += 1
+        self._log.append((self._seq, event))
+        self._cond.notify_all()
+
+    def apply(self, event):
+        """Updates the registry from one watch event."""
+        event_type = event.get("eventType") or event.get("type")
+        port = event.get("port") or {}
+        key = _port_key(port)
+        with self._cond:
+            if event_type == "add":
+                entry = {"port": port, "matching_boards": event.get("matching_boards") or event.get("boards") or []}
+                self.ports[key] = entry
+                self._emit({"type": "add", **entry})
+            elif event_type == "remove":
+                entry = self.ports.pop(key, None)
+                self._emit({"type": "remove", "port": entry["port"] if entry else port})
+            elif event_type == "error" or event.get("error"):
+                self.last_error = event.get("error") or event.get("message")
+
+    def _clear(self):
+        # The stream is gone; anything we knew about may be stale now.
+        with self._cond:
+            for entry in list(self.ports.values()):
+                self._emit({"type": "remove", "port": entry["port"]})
+            self.ports.clear()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            events = None
+            try:
+                events = self.source()
+                with self._cond:
+                    self._events = events
+                if self._stopped.is_set():
+                    break  # stop() ran before it could see this source.
+                for event in events:
+                    if self._stopped.is_set():
+                        break
+                    self.apply(event)
+            except Exception as e:
+                # Whatever went wrong, keep the thread alive and retry after the delay.
+                self.last_error = str(e) or type(e).__name__
+            finally:
+                with self._cond:
+                    self._events = None
+                if hasattr(events, "close"):
+                    events.close()
+            self._clear()
+            self._stopped.wait(self.restart_delay)
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+# Build outputs worth keeping next to a cached result.
+ARTIFACT_SUFFIXES = (".hex", ".bin", ".elf", ".eep", ".uf2", ".map")
+
+
+class BuildCache:
+    """
+    Persistent compile cache.
+
+    Results are keyed by a hash of the sketch files, the FQBN and the installed
+    core/library versions, so an unchanged sketch is answered without running
+    the toolchain. Every sketch/FQBN pair also gets a stable `--build-path`
+    (only modified translation units recompile) and all builds share one
+    `--build-cache-path` for precompiled cores. Results and build directories
+    are evicted least-recently-used once the cache grows past `max_bytes`;
+    the shared core cache is not evicted.
+    """
+
+    def __init__(self, root, max_bytes=2 * 1024 ** 3):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.results_dir = self.root / "results"
+        self.builds_dir = self.root / "builds"
+        self.core_cache_dir = self.root / "core-cache"
+        for directory in (self.results_dir, self.builds_dir, self.core_cache_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._build_locks = defaultdict(threading.Lock)
+        self._active = set()
+
+    # =================== Keys & Paths ===================
+
+    def key(self, sketch_path, fqbn, toolchain=""):
+        """Content hash identifying one build of `sketch_path` for `fqbn`."""
+        digest = hashlib.sha256()
+        digest.update(f"{fqbn}\0{toolchain}\0".encode("utf-8"))
+        root = Path(sketch_path)
+        for file_path in sorted(_sketch_files(root)):
+            digest.update(file_path.relative_to(root).as_posix().encode("utf-8") + b"\0")
+            digest.update(hashlib.sha256(file_path.read_bytes()).digest())
+        return digest.hexdigest()
+
+    def build_path(self, sketch_path, fqbn):
+        sketch_id = hashlib.sha1(str(Path(sketch_path).resolve()).encode("utf-8")).hexdigest()[:16]
+        return self.builds_dir / sketch_id / re.sub(r"[^A-Za-z0-9._-]", "_", fqbn)
+
+    @contextmanager
+    def build_dir(self, sketch_path, fqbn):
+        """
+        Reserves the stable build directory for one compile. Concurrent builds of
+        the same sketch/FQBN wait for each other, and eviction skips it meanwhile.
+        """
+        path = self.build_path(sketch_path, fqbn)
+        with self._lock:
+            build_lock = self._build_locks[path]
+        with build_lock:
+            with self._lock:
+                self._active.add(path)
+            try:
+                path.mkdir(parents=True, exist_ok=True)
+                os.utime(path)
+                yield path
+            finally:
+                with self._lock:
+                    self._active.discard(path)
+
+    # =================== Results ===================
+
+    def lookup(self, key, record_miss=True):
+        """
+        Returns the stored result for `key` (refreshing its LRU position), or
+        None. Pass `record_miss=False` for a pre-check that will be followed by
+        another lookup, so one compile counts as a single miss.
+        """
+        result_file = self.results_dir / key / "result.json"
+        try:
+            result = json.loads(result_file.read_text(encoding="utf-8"))
+            os.utime(result_file.parent)
+        except (OSError, ValueError):
+            if record_miss:
+                with self._lock:
+                    self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def store(self, key, result, build_path):
+        """Saves a successful compile's result and copies its artifacts out of `build_path`."""
+        entry_dir = self.results_dir / key
+        tmp_dir = self.results_dir / f".{key}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        artifacts = []
+        for artifact in sorted(Path(build_path).glob("*")):
+            if artifact.is_file() and artifact.suffix in ARTIFACT_SUFFIXES:
+                shutil.copy2(artifact, tmp_dir / artifact.name)
+                artifacts.append(artifact.name)
+        result = {**result, "artifacts": artifacts, "cached_at": time.time()}
+        (tmp_dir / "result.json").write_text(json.dumps(result), encoding="utf-8")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        tmp_dir.rename(entry_dir)
+        self.evict()
+        return result
+
+    def artifact_dir(self, key):
+        return self.results_dir / key
+
+    # =================== Eviction & Stats ===================
+
+    def _units(self):
+        """Every evictable directory as (last_used, size, path); skips ones removed meanwhile."""
+        units = [entry for entry in _subdirs(self.results_dir) if not entry.name.startswith(".")]
+        units += [build for sketch in _subdirs(self.builds_dir) for build in _subdirs(sketch)]
+        found = []
+        for unit in units:
+            try:
+                found.append((unit.stat().st_mtime, _dir_size(unit), unit))
+            except FileNotFoundError:
+                pass
+        return found
+
+    def evict(self):
+        """Removes least-recently-used results and build directories until under `max_bytes`."""
+        with self._evict_lock:
+            units = sorted(self._units(), key=lambda unit: unit[0])
+            total = sum(size for _, size, _ in units)
+            for _, size, path in units:
+                if total <= self.max_bytes:
+                    break
+                if path.parent == self.results_dir:
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    # A build directory is only removed while nobody is compiling in it.
+                    with self._lock:
+                        build_lock = self._build_locks[path]
+                    if not build_lock.acquire(blocking=False):
+                        continue
+                    try:
+                        shutil.rmtree(path, ignore_errors=True)
+                    finally:
+                        build_lock.release()
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            for sketch in _subdirs(self.builds_dir):
+                with self._lock:
+                    # build_dir() registers a path before creating it, so an
+                    # empty folder with no active build can go.
+                    if any(path.parent == sketch for path in self._active):
+                        continue
+                    try:
+                        sketch.rmdir()
+                    except OSError:
+                        pass  # Not empty.
+
+    def stats(self):
+        units = self._units()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "results": sum(1 for _, _, path in units if path.parent == self.results_dir),
+                "build_dirs": sum(1 for _, _, path in units if path.parent != self.results_dir),
+                "bytes": sum(size for _, size, _ in units),
+                "core_cache_bytes": _dir_size(self.core_cache_dir),
+                "max_bytes": self.max_bytes,
+                "root": self.root.as_posix(),
+            }
+
+
+def _sketch_files(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Skip hidden folders and exported binaries; they don't affect the build.
+        dirnames[:] = [d for d in dirnames if not d.startswith(".") and d != "build"]
+        for filename in filenames:
+            if not filename.startswith("."):
+                yield Path(dirpath) / filename
+
+
+def _subdirs(path):
+    try:
+        return [entry for entry in path.iterdir() if entry.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
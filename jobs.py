@@ -0,0 +1,380 @@
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+
+# Build size lines printed by arduino-cli at the end of a successful compile.
+_FLASH_RE = re.compile(r"Sketch uses (\d+) bytes \((\d+)%\) of program storage space\. Maximum is (\d+) bytes")
+_RAM_RE = re.compile(r"Global variables use (\d+) bytes \((\d+)%\) of dynamic memory.*?Maximum is (\d+) bytes")
+
+# Rough peak memory of one toolchain run, used to cap parallel matrix builds.
+BUILD_MEMORY_BYTES = 512 * 1024 * 1024
+
+
+def summarize_build(output):
+    """Extracts warning count and flash/RAM usage from compile output."""
+    summary = {"warnings": len(re.findall(r"\bwarning:", output)), "flash": None, "ram": None}
+    for key, pattern in (("flash", _FLASH_RE), ("ram", _RAM_RE)):
+        match = pattern.search(output)
+        if match:
+            used, percent, maximum = (int(group) for group in match.groups())
+            summary[key] = {"used": used, "percent": percent, "max": maximum}
+    return summary
+
+
+def available_memory():
+    """Bytes of memory available for new processes, or None when unknown."""
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def matrix_workers():
+    """Parallel builds for a matrix compile: one per core, fewer if memory is short."""
+    workers = os.cpu_count() or 1
+    memory = available_memory()
+    if memory is not None:
+        workers = min(workers, memory // BUILD_MEMORY_BYTES)
+    return max(1, workers)
+
+
+class Job:
+    """A single compile or upload run whose output can be followed while it executes."""
+
+    FINISHED = ("succeeded", "failed", "cancelled")
+
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.returncode = None
+        self.lines = []
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+        self.process = None
+        self.children = []
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in self.FINISHED
+
+    def set_status(self, status):
+        with self._cond:
+            self.status = status
+            if status == "running":
+                self.started = time.time()
+            elif status in self.FINISHED:
+                self.finished = time.time()
+            self._cond.notify_all()
+
+    def append(self, line):
+        with self._cond:
+            self.lines.append(line)
+            self._cond.notify_all()
+
+    def follow(self, start=0, keepalive=15.0):
+        """
+        Yields (index, line) for output from `start` on, blocking for new lines
+        until the job finishes. Yields (None, None) every `keepalive` seconds of
+        silence so callers can keep idle connections open.
+        """
+        index = start
+        while True:
+            with self._cond:
+                if index >= len(self.lines) and not self.done:
+                    self._cond.wait(keepalive)
+                pending = self.lines[index:]
+                finished = self.done
+            for line in pending:
+                yield index, line
+                index += 1
+            if finished and index >= len(self.lines):
+                return
+            if not pending:
+                yield None, None
+
+    def to_dict(self, include_output=False):
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "returncode": self.returncode,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            **self.params,
+        }
+        if include_output:
+            data["output"] = "".join(self.lines)
+        return data
+
+
+class JobManager:
+    """
+    Runs compiles and uploads on a bounded worker pool (one worker per CPU by
+    default) so they no longer tie up a request thread. Uploads to the same
+    serial port are queued and handed to the pool one at a time, so waiting
+    uploads never hold a worker. The most recent `history` jobs are kept.
+
+    With a `build_cache`, compiles reuse stored results and stable build
+    directories; `toolchain()` must then return a string describing the
+    installed cores and libraries, which becomes part of the cache key.
+    `port_guard(port)` is entered around every upload, e.g. to make the
+    serial monitor let go of the port.
+    """
+
+    def __init__(self, cli, max_workers=None, history=100, build_cache=None, toolchain=None, port_guard=None):
+        self.cli = cli
+        self.history = history
+        self.build_cache = build_cache
+        self.toolchain = toolchain or (lambda: "")
+        self.port_guard = port_guard or (lambda port: nullcontext())
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._port_queues = {}  # port -> uploads waiting behind the one in progress
+
+    # =================== Submission ===================
+
+    def submit_compile(self, fqbn, sketch_path):
+        job = Job("compile", {"fqbn": fqbn, "sketch_path": sketch_path})
+        return self._submit(job, self._run_compile)
+
+    def submit_upload(self, fqbn, sketch_path, port):
+        job = Job("upload", {"fqbn": fqbn, "sketch_path": sketch_path, "port": port})
+        with self._lock:
+            waiting = self._port_queues.get(port)
+            if waiting is not None:
+                # Started by _next_upload once the uploads ahead of it are done.
+                self._jobs[job.id] = job
+                self._trim()
+                waiting.append(job)
+                job.append(f"Waiting for another upload to {port} to finish...\n")
+                return job
+            self._port_queues[port] = deque()
+        return self._submit(job, self._run_upload)
+
+    def submit_matrix(self, sketch_path, fqbns):
+        """
+        Compiles one sketch for several boards in parallel. Each target is its
+        own compile job on the shared pool, and at most `matrix_workers()`
+        (checked now, against the memory free at submission) run at once. The
+        parent job logs a line per finished target and collects their
+        summaries in `results`.
+        """
+        parent = Job("matrix", {"sketch_path": sketch_path, "fqbns": list(fqbns), "targets": [], "results": []})
+        children = [Job("compile", {"fqbn": fqbn, "sketch_path": sketch_path, "matrix": parent.id}) for fqbn in fqbns]
+        parent.params["targets"] = [child.id for child in children]
+        parent.children = children
+        parent.set_status("running")
+        with self._lock:
+            self._jobs[parent.id] = parent
+            for child in children:
+                self._jobs[child.id] = child
+            self._trim()
+        waiting = deque(children)
+        for _ in range(min(matrix_workers(), len(children))):
+            self._next_target(parent, waiting)
+        return parent
+
+    def _next_target(self, parent, waiting):
+        # Each finished target starts the next, so a matrix never holds more
+        # than its share of the pool.
+        try:
+            child = waiting.popleft()
+        except IndexError:
+            return
+        def done(_):
+            try:
+                self._target_done(parent, child)
+            finally:
+                self._next_target(parent, waiting)
+
+        self._executor.submit(self._guard, self._run_target, child).add_done_callback(done)
+
+    def _submit(self, job, runner):
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._guard, runner, job)
+        return job
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    # =================== Queries & Control ===================
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. Returns False when there is nothing to cancel."""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel_requested = True
+        for child in job.children:
+            self.cancel(child.id)
+        process = job.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+        return True
+
+    # =================== Runners ===================
+
+    def _guard(self, runner, job):
+        # Never leave a job "running" forever because its runner blew up.
+        try:
+            runner(job)
+        except Exception as e:
+            job.append(f"Internal error: {e}\n")
+            job.set_status("failed")
+
+    def _run_compile(self, job):
+        fqbn, sketch_path = job.params["fqbn"], job.params["sketch_path"]
+        if self.build_cache is None:
+            self._run(job, self.cli.compile_args(fqbn, sketch_path))
+            return
+
+        key = self.build_cache.key(sketch_path, fqbn, self.toolchain())
+        if self._answer_from_cache(job, key, self.build_cache.lookup(key, record_miss=False)):
+            return
+
+        with self.build_cache.build_dir(sketch_path, fqbn) as build_path:
+            # An identical compile may have finished while we waited for the directory.
+            if self._answer_from_cache(job, key, self.build_cache.lookup(key)):
+                return
+            self._run(job, self.cli.compile_args(fqbn, sketch_path, build_path, self.build_cache.core_cache_dir))
+            if job.status == "succeeded":
+                job.params.update(cache_key=key, cached=False, artifacts=[])
+                try:
+                    stored = self.build_cache.store(key, {"output": "".join(job.lines), "fqbn": fqbn, "sketch_path": sketch_path}, build_path)
+                    job.params["artifacts"] = stored["artifacts"]
+                except OSError as e:
+                    # The build itself succeeded; it just won't be reused.
+                    job.params["cache_error"] = str(e)
+
+    def _answer_from_cache(self, job, key, cached):
+        if cached is None or job.cancel_requested:
+            return False
+        job.params.update(cache_key=key, cached=True, artifacts=cached["artifacts"])
+        job.set_status("running")
+        job.append(cached["output"])
+        job.returncode = 0
+        job.set_status("succeeded")
+        return True
+
+    def _run_target(self, job):
+        start = time.monotonic()
+        self._run_compile(job)
+        output = "".join(job.lines)
+        job.params.update(summarize_build(output) if job.status == "succeeded" else {"warnings": len(re.findall(r"\bwarning:", output))})
+        job.params["wall_time"] = round(time.monotonic() - start, 3)
+
+    def _target_done(self, parent, child):
+        result = {key: child.params.get(key) for key in ("fqbn", "warnings", "flash", "ram", "wall_time", "cached")}
+        result.update(job_id=child.id, status=child.status)
+        with parent._cond:
+            parent.params["results"].append(result)
+            finished = len(parent.params["results"]) == len(parent.children)
+        details = [f"{result['wall_time']}s"]
+        if result.get("flash"):
+            details.append(f"flash {result['flash']['used']} B ({result['flash']['percent']}%)")
+        if result.get("ram"):
+            details.append(f"RAM {result['ram']['used']} B ({result['ram']['percent']}%)")
+        details.append(f"{result['warnings']} warnings")
+        parent.append(f"[{child.params['fqbn']}] {child.status}: {', '.join(details)}\n")
+        if finished:
+            statuses = {r["status"] for r in parent.params["results"]}
+            if parent.cancel_requested:
+                parent.set_status("cancelled")
+            else:
+                parent.set_status("succeeded" if statuses == {"succeeded"} else "failed")
+
+    def _run_upload(self, job):
+        port, fqbn, sketch_path = job.params["port"], job.params["fqbn"], job.params["sketch_path"]
+        try:
+            input_dir = self._upload_input_dir(fqbn, sketch_path)
+            if input_dir is not None:
+                job.params["input_dir"] = input_dir.as_posix()
+            with self.port_guard(port):
+                self._run(job, self.cli.upload_args(fqbn, sketch_path, port, input_dir))
+        finally:
+            self._next_upload(port)
+
+    def _upload_input_dir(self, fqbn, sketch_path):
+        """
+        Where the binaries to flash live: compiles write to the build cache, not
+        the sketch's default build path that `upload` would otherwise read.
+        The stored result for the sketch as it is now wins; otherwise the
+        sketch's stable build directory.
+        """
+        if self.build_cache is None:
+            return None
+        key = self.build_cache.key(sketch_path, fqbn, self.toolchain())
+        result_dir = self.build_cache.artifact_dir(key)
+        if (result_dir / "result.json").is_file():
+            return result_dir
+        build_path = self.build_cache.build_path(sketch_path, fqbn)
+        return build_path if build_path.is_dir() else None
+
+    def _next_upload(self, port):
+        with self._lock:
+            waiting = self._port_queues[port]
+            if not waiting:
+                del self._port_queues[port]
+                return
+            job = waiting.popleft()
+        self._executor.submit(self._guard, self._run_upload, job)
+
+    def _run(self, job, command):
+        if job.cancel_requested:
+            job.set_status("cancelled")
+            return
+        job.set_status("running")
+        start = time.perf_counter()
+        try:
+            job.process = self.cli.stream(command)
+        except FileNotFoundError:
+            job.append(f"The command '{self.cli.cli}' was not found. Please ensure arduino-cli is installed and in your system's PATH.\n")
+            job.set_status("failed")
+            return
+        if job.cancel_requested:
+            job.process.terminate()  # Cancelled while the process was being started.
+
+        output_bytes = 0
+        for line in job.process.stdout:
+            output_bytes += len(line)
+            job.append(line)
+        job.returncode = job.process.wait()
+        # A cancelled run is not a CLI error, but its time and output still count.
+        self.cli.record_stream(command, time.perf_counter() - start, output_bytes,
+                               failed=job.returncode != 0 and not job.cancel_requested)
+        if job.cancel_requested:
+            job.set_status("cancelled")
+        else:
+            job.set_status("succeeded" if job.returncode == 0 else "failed")
@@ -0,0 +1,153 @@
+import bisect
+import json
+import re
+import threading
+from pathlib import Path
+
+# How much a query token matching each field counts towards a library's score.
+FIELD_WEIGHTS = {"name": 8.0, "author": 3.0, "maintainer": 3.0, "category": 2.0, "sentence": 1.0}
+PREFIX_FACTOR = 0.5
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text or "").lower())
+
+
+def version_key(version):
+    """Sort key for library versions like "1.10.2" (non-numeric parts sort first)."""
+    return tuple(int(part) if part.isdigit() else -1 for part in re.split(r"[.\-+]", version or ""))
+
+
+class _Snapshot:
+    """One immutable build of the index; searches keep using the one they started with."""
+
+    def __init__(self, libraries=(), postings=None):
+        self.libraries = list(libraries)
+        self.postings = postings or {}
+        self.tokens = sorted(self.postings)
+
+
+class LibraryIndex:
+    """
+    In-memory search index over arduino-cli's `library_index.json`.
+
+    The index file is parsed once and re-parsed only when its mtime changes.
+    Each library keeps only its latest release plus the list of available
+    versions, and an inverted index maps tokens of the name, author,
+    maintainer, category and sentence to weighted postings. Queries are
+    prefix-aware, ranked and paginated.
+    """
+
+    def __init__(self, index_path):
+        # `index_path` may be a path or a callable returning one (or None),
+        # so the data directory can be resolved lazily.
+        self._index_path = index_path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._snapshot = _Snapshot()
+
+    @property
+    def libraries(self):
+        return self._snapshot.libraries
+
+    @property
+    def path(self):
+        path = self._index_path() if callable(self._index_path) else self._index_path
+        return Path(path) if path else None
+
+    def available(self):
+        """Loads or refreshes the index. Returns False when there is no index file."""
+        path = self.path
+        try:
+            mtime = path.stat().st_mtime if path else None
+        except OSError:
+            mtime = None
+        if mtime is None:
+            return False
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._build(path)
+                    self._mtime = mtime
+        return True
+
+    def _build(self, path):
+        releases = json.loads(path.read_text(encoding="utf-8")).get("libraries", [])
+        by_name = {}
+        for release in releases:
+            name = release.get("name")
+            if not name:
+                continue
+            entry = by_name.setdefault(name, {"name": name, "latest": release, "available_versions": []})
+            entry["available_versions"].append(release.get("version"))
+            if version_key(release.get("version")) > version_key(entry["latest"].get("version")):
+                entry["latest"] = release
+
+        libraries = sorted(by_name.values(), key=lambda lib: lib["name"].lower())
+        postings = {}
+        for lib_id, lib in enumerate(libraries):
+            lib["available_versions"].sort(key=version_key)
+            latest = lib["latest"]
+            for field, weight in FIELD_WEIGHTS.items():
+                text = lib["name"] if field == "name" else latest.get(field)
+                for token in set(tokenize(text)):
+                    lib_postings = postings.setdefault(token, {})
+                    lib_postings[lib_id] = max(lib_postings.get(lib_id, 0.0), weight)
+
+        self._snapshot = _Snapshot(libraries, postings)
+
+    def _token_scores(self, snapshot, token):
+        """Scores for every library in `snapshot` matching `token` exactly or as a prefix."""
+        scores = dict(snapshot.postings.get(token, {}))
+        start = bisect.bisect_left(snapshot.tokens, token)
+        for candidate in snapshot.tokens[start:]:
+            if not candidate.startswith(token):
+                break
+            if candidate == token:
+                continue
+            for lib_id, weight in snapshot.postings[candidate].items():
+                scores[lib_id] = max(scores.get(lib_id, 0.0), weight * PREFIX_FACTOR)
+        return scores
+
+    def search(self, query, page=1, per_page=20, installed=None):
+        """
+        Returns libraries matching every token of `query`, best first, shaped
+        like `lib search --format=json` plus pagination fields. `installed`
+        maps library names to their installed version.
+        """
+        installed = installed or {}
+        tokens = tokenize(query)
+        snapshot = self._snapshot  # A concurrent rebuild swaps in a new one.
+        libraries, postings = snapshot.libraries, None
+        for token in tokens:
+            token_scores = self._token_scores(snapshot, token)
+            if postings is None:
+                postings = token_scores
+            else:
+                postings = {lib_id: score + token_scores[lib_id] for lib_id, score in postings.items() if lib_id in token_scores}
+            if not postings:
+                break
+
+        needle = query.strip().lower()
+        ranked = []
+        for lib_id, score in (postings or {}).items():
+            name = libraries[lib_id]["name"].lower()
+            if name == needle:
+                score += 100.0
+            elif name.startswith(needle):
+                score += 20.0
+            ranked.append((-score, name, lib_id))
+        ranked.sort()
+
+        page, per_page = max(1, page), max(1, per_page)
+        results = []
+        for _, _, lib_id in ranked[(page - 1) * per_page:page * per_page]:
+            lib = libraries[lib_id]
+            results.append({
+                **lib,
+                "installed": lib["name"] in installed,
+                "installed_version": installed.get(lib["name"]),
+            })
+        return {"libraries": results, "total": len(ranked), "page": page, "per_page": per_page}
@@ -1,28 +1,102 @@
 import os
+import re
 import json
+import time
+import hashlib
+import cProfile
+import threading
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, send_from_directory
 from arduino_cli import ArduinoCLI
+from board_catalog import BoardCatalog
+from board_watcher import BoardWatcher, cli_watch_source
+from build_cache import BuildCache
+from jobs import JobManager
+from library_index import LibraryIndex
+from serial_monitor import SerialMonitor
+from workspace import StaleWriteError, file_version, read_workspace, save_file
+from metadata_cache import MetadataCache
+from metrics import REGISTRY
 
 app = Flask(__name__)
-cli = ArduinoCLI()
+# ARDUINO_CLI_BACKEND=daemon keeps one `arduino-cli daemon` running instead of
+# forking the CLI for every call (requires grpcio and the generated stubs).
+cli = ArduinoCLI(backend=os.environ.get("ARDUINO_CLI_BACKEND", "subprocess"))
+
+# Board, core, library and sketch listings only change after an install or a
+# new sketch, so they are cached and dropped whenever the CLI reports a change.
+metadata_cache = MetadataCache(ttl=float(os.environ.get("METADATA_CACHE_TTL", 300)))
+cli.add_change_listener(metadata_cache.invalidate)
+
+build_cache = BuildCache(
+    os.environ.get("BUILD_CACHE_DIR", Path.home() / ".cache" / "arduinogui" / "build"),
+    max_bytes=int(os.environ.get("BUILD_CACHE_MAX_MB", 2048)) * 1024 * 1024,
+)
+
+def toolchain_fingerprint():
+    """Installed core and library versions; a change to either invalidates cached builds."""
+    cores = metadata_cache.get("cores", cli.core_list).data
+    libraries = metadata_cache.get("libraries", cli.list_libs).data
+    versions = [f"{p.get('id')}@{p.get('installed_version')}" for p in cores.get('platforms') or []]
+    versions += [f"{l.get('library', {}).get('name')}@{l.get('library', {}).get('version')}" for l in libraries.get('installed_libraries') or []]
+    return ",".join(sorted(versions))
+
+# Compact board index built from the cached listings; only re-reads the
+# boards of platforms that were added, removed or upgraded.
+def load_catalog_boards(fresh=False):
+    if fresh:
+        # The cores listing changed; a cached board listing may predate that.
+        metadata_cache.invalidate("boards")
+    return metadata_cache.get("boards", cli.board_list_all).data
+
+board_catalog = BoardCatalog(
+    load_boards=load_catalog_boards,
+    load_cores=lambda: metadata_cache.get("cores", cli.core_list).data,
+    load_details=cli.board_details,
+)
+
+# Connected ports come from one background `board list --watch` stream,
+# started on first use.
+board_watcher = BoardWatcher(cli_watch_source(cli))
+
+# One reader per serial port, shared by every open monitor (needs pyserial).
+serial_monitor = SerialMonitor()
+
+# Compiles and uploads run in the background; routes return a job id at once.
+# Uploads make the serial monitor release their port until they finish.
+jobs = JobManager(
+    cli, max_workers=int(os.environ.get("JOB_WORKERS", 0)) or None,
+    build_cache=build_cache, toolchain=toolchain_fingerprint,
+    port_guard=serial_monitor.released,
+)
 
 # --- Pathlib-based Path Management ---
 
 SKETCHBOOK_PATH = None
+_sketchbook_lock = threading.Lock()
+_sketchbook_looked_up = False
 
 def get_sketchbook_path():
-    """Fetches, validates, and sets the global SKETCHBOOK_PATH."""
-    global SKETCHBOOK_PATH
-
+    """
+    Returns the sketchbook path, looking it up (and setting the global
+    SKETCHBOOK_PATH) on first use rather than at import, so startup doesn't
+    wait on the CLI.
+    """
+    global SKETCHBOOK_PATH, _sketchbook_looked_up
+    with _sketchbook_lock:
+        if not _sketchbook_looked_up:
+            SKETCHBOOK_PATH = _find_sketchbook_path()
+            _sketchbook_looked_up = True
+    return SKETCHBOOK_PATH
+
+def _find_sketchbook_path():
     # Try the specific config command first
     result = cli._execute(["config", "get", "directories.user"])
     if result and result.get("success") and result.get("output"):
         path_str = result.get("output").strip()
         path_obj = Path(path_str).resolve()
         if path_obj.is_dir():
-            SKETCHBOOK_PATH = path_obj
-            return # Success
+            return path_obj
 
     # Fallback to dumping the full config
     config = cli._execute(["config", "dump"], parse_json=True)
@@ -30,22 +104,94 @@ def get_sketchbook_path():
         path_str = config['directories']['user']
         path_obj = Path(path_str).resolve()
         if path_obj.is_dir():
-            SKETCHBOOK_PATH = path_obj
-            return # Success
-
-# --- Initialize Sketchbook Path on Application Start ---
-get_sketchbook_path()
+            return path_obj
+    return None
+
+DATA_PATH = None
+_data_path_lock = threading.Lock()
+_data_path_looked_up = False
+
+def get_data_path():
+    """
+    Returns arduino-cli's data directory (home of the package and library
+    indexes), looked up once. A failed lookup is remembered too, so callers
+    fall back without asking the CLI again on every request.
+    """
+    global DATA_PATH, _data_path_looked_up
+    with _data_path_lock:
+        if not _data_path_looked_up:
+            result = cli._execute(["config", "get", "directories.data"])
+            if result and result.get("success") and result.get("output", "").strip():
+                DATA_PATH = Path(result["output"].strip())
+            _data_path_looked_up = True
+    return DATA_PATH
+
+# Library searches are served from an in-memory index of library_index.json,
+# falling back to `lib search` when the index file can't be found.
+library_index = LibraryIndex(lambda: get_data_path() and get_data_path() / "library_index.json")
 
 def is_safe_path(path_to_check):
     """Ensures a given path is a safe child of the sketchbook path."""
-    if not SKETCHBOOK_PATH or not path_to_check:
+    sketchbook_path = get_sketchbook_path()
+    if not sketchbook_path or not path_to_check:
         return False
     try:
         resolve_path = Path(path_to_check).resolve()
-        return SKETCHBOOK_PATH == resolve_path or SKETCHBOOK_PATH in resolve_path.parents
+        return sketchbook_path == resolve_path or sketchbook_path in resolve_path.parents
     except Exception:
         return False
 
+def etag_json(body, etag=None):
+    """Serves a JSON body with an ETag, answering 304 when the client's copy matches."""
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag or hashlib.sha1(body).hexdigest())
+    response.cache_control.no_cache = True  # Always revalidate; the ETag makes that cheap.
+    return response.make_conditional(request)
+
+def cached_json(key, loader):
+    """Serves a cached CLI listing through etag_json."""
+    entry = metadata_cache.get(key, loader)
+    return etag_json(entry.body, entry.etag)
+
+# --- Instrumentation ---
+
+REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "Time to produce a response (streams: until headers).", ["route", "method"])
+REQUESTS = REGISTRY.counter("http_requests_total", "Requests served, by status code.", ["route", "method", "status"])
+RESPONSE_BYTES = REGISTRY.counter("http_response_bytes_total", "Bytes of non-streamed response bodies.", ["route", "method"])
+
+# Opt-in profiling: with PROFILE_DIR set, a request carrying `?profile=1` or an
+# `X-Profile: 1` header is run under cProfile and its stats are written there.
+PROFILE_DIR = os.environ.get("PROFILE_DIR")
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if PROFILE_DIR and (request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile_path = Path(PROFILE_DIR) / f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'}-{os.getpid()}-{threading.get_ident()}.prof"
+        profiler.dump_stats(profile_path)
+        response.headers["X-Profile-File"] = profile_path.as_posix()
+    REQUEST_SECONDS.observe(time.perf_counter() - g.pop("request_start", time.perf_counter()), route=route, method=request.method)
+    REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    if not response.is_streamed and response.content_length is not None:
+        RESPONSE_BYTES.inc(response.content_length, route=route, method=request.method)
+    return response
+
+@app.route("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 # --- Main App and API Routes --- #
 
 @app.route("/")
@@ -56,24 +202,27 @@ def index():
 
 @app.route("/api/directories/sketchbook", methods=['GET'])
 def get_sketchbook_directory():
-    if SKETCHBOOK_PATH:
+    if get_sketchbook_path():
         return jsonify({"path": SKETCHBOOK_PATH.as_posix()})
     return jsonify({"error": True, "message": "Sketchbook path not configured or found."}), 500
 
-@app.route("/api/sketches", methods=['GET'])
-def list_sketches():
+def load_sketches():
     sketch_data = cli.sketch_list()
     if sketch_data and 'sketchbooks' in sketch_data:
         for sketchbook in sketch_data.get('sketchbooks', []):
             for sketch in sketchbook.get('sketches', []):
                 if 'path' in sketch:
                     sketch['path'] = Path(sketch['path']).as_posix()
-    return jsonify(sketch_data)
+    return sketch_data
+
+@app.route("/api/sketches", methods=['GET'])
+def list_sketches():
+    return cached_json("sketches", load_sketches)
 
 @app.route("/api/sketches/new", methods=['POST'])
 def new_sketch():
     sketch_name = request.json.get("name")
-    if not sketch_name or not SKETCHBOOK_PATH:
+    if not sketch_name or not get_sketchbook_path():
         return jsonify({"error": True, "message": "Invalid name or sketchbook path."}), 400
     
     full_sketch_path = SKETCHBOOK_PATH / sketch_name
@@ -114,7 +263,19 @@ def manage_file():
             return jsonify({"success": True, "message": f"File deleted: {file_path.name}"})
         except Exception as e: return jsonify({"error": True, "message": str(e)}), 500
 
-@app.route("/api/sketch/file/content", methods=['GET', 'PUT'])
+@app.route("/api/sketch/workspace", methods=['GET'])
+def get_workspace():
+    """Every file of a sketch with size, mtime, version hash and content in one response."""
+    sketch_path_str = request.args.get('path')
+    if not is_safe_path(sketch_path_str):
+        return jsonify({"error": True, "message": "Invalid or unsafe sketch path."}), 403
+    try:
+        workspace = read_workspace(sketch_path_str)
+        return etag_json(workspace, workspace["version"])
+    except Exception as e:
+        return jsonify({"error": True, "message": str(e)}), 500
+
+@app.route("/api/sketch/file/content", methods=['GET', 'PUT', 'PATCH'])
 def file_content():
     file_path_str = request.args.get('path') if request.method == 'GET' else request.json.get('path')
     if not is_safe_path(file_path_str):
@@ -123,10 +284,23 @@ def file_content():
     file_path = Path(file_path_str)
     try:
         if request.method == 'GET':
-            return jsonify({"content": file_path.read_text(encoding='utf-8')})
-        elif request.method == 'PUT':
-            file_path.write_text(request.json.get('content', ''), encoding='utf-8')
-            return jsonify({"success": True, "message": "File saved."})
+            data = file_path.read_bytes()
+            version = file_version(data)
+            return etag_json({"content": data.decode('utf-8', errors='replace'), "version": version}, version)
+
+        # Saves are atomic; with base_version they are rejected if the file changed meanwhile.
+        base_version = request.json.get('base_version')
+        if request.method == 'PUT':
+            version = save_file(file_path, base_version, content=request.json.get('content', ''))
+        else:
+            patches = request.json.get('patches')
+            if not isinstance(patches, list):
+                return jsonify({"error": True, "message": "A list of patches is required."}), 400
+            version = save_file(file_path, base_version, patches=patches)
+        return jsonify({"success": True, "message": "File saved.", "version": version})
+    except StaleWriteError as e:
+        return jsonify({"error": True, "message": f"{e} Reload it before saving.", "version": e.current_version}), 409
+    except (ValueError, KeyError, TypeError) as e: return jsonify({"error": True, "message": str(e)}), 400
     except Exception as e: return jsonify({"error": True, "message": str(e)}), 500
 
 @app.route("/api/sketch/file/rename", methods=['POST'])
@@ -152,7 +326,17 @@ def compile_sketch():
     sketch_path_str = request.json.get("sketch_path")
     if not fqbn or not is_safe_path(sketch_path_str):
         return jsonify({"error": True, "message": "Board (FQBN) or sketch path are invalid."}), 400
-    return jsonify(cli.compile(fqbn, sketch_path_str))
+    return jsonify(jobs.submit_compile(fqbn, sketch_path_str).to_dict()), 202
+
+@app.route("/api/compile/matrix", methods=['POST'])
+def compile_matrix():
+    fqbns = request.json.get("fqbns")
+    sketch_path_str = request.json.get("sketch_path")
+    if not is_safe_path(sketch_path_str):
+        return jsonify({"error": True, "message": "Invalid or unsafe sketch path."}), 400
+    if not isinstance(fqbns, list) or not fqbns or not all(isinstance(f, str) and f for f in fqbns):
+        return jsonify({"error": True, "message": "A non-empty list of FQBNs is required."}), 400
+    return jsonify(jobs.submit_matrix(sketch_path_str, list(dict.fromkeys(fqbns))).to_dict()), 202
 
 @app.route("/api/upload", methods=['POST'])
 def upload_sketch():
@@ -161,17 +345,165 @@ def upload_sketch():
     sketch_path_str = request.json.get("sketch_path")
     if not fqbn or not port or not is_safe_path(sketch_path_str):
         return jsonify({"error": True, "message": "Board, port, or sketch path are invalid."}), 400
-    return jsonify(cli.upload(fqbn, sketch_path_str, port))
+    return jsonify(jobs.submit_upload(fqbn, sketch_path_str, port).to_dict()), 202
+
+# --- Build Jobs ---
+
+@app.route("/api/jobs")
+def list_jobs():
+    return jsonify({"jobs": [job.to_dict() for job in jobs.list()]})
+
+@app.route("/api/jobs/<job_id>")
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": True, "message": "Job not found."}), 404
+    return jsonify(job.to_dict(include_output=True))
+
+@app.route("/api/jobs/<job_id>/stream")
+def stream_job(job_id):
+    """Streams a job's output as Server-Sent Events, ending with a `done` event."""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": True, "message": "Job not found."}), 404
+    # EventSource sends Last-Event-ID on reconnect, so resume after that line.
+    start = request.headers.get("Last-Event-ID", default=-1, type=int) + 1
+
+    def events():
+        for index, line in job.follow(start):
+            if index is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"id: {index}\ndata: {json.dumps(line)}\n\n"
+        yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/jobs/<job_id>/cancel", methods=['POST'])
+def cancel_job(job_id):
+    if not jobs.cancel(job_id):
+        return jsonify({"error": True, "message": "Job not found or already finished."}), 404
+    return jsonify({"success": True, "message": "Cancellation requested."})
+
+# --- Connected Boards ---
+
+@app.route("/api/ports")
+def get_ports():
+    board_watcher.start()
+    return jsonify(board_watcher.snapshot())
+
+@app.route("/api/ports/events")
+def stream_port_events():
+    """Streams the port registry: a `snapshot` event, then `add`/`remove` changes."""
+    board_watcher.start()
+
+    def events():
+        snapshot = board_watcher.snapshot()
+        seq = snapshot["seq"]
+        yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+        while True:
+            seq, changes = board_watcher.wait(seq)
+            if changes is None:  # Fell behind the change log; start over from a snapshot.
+                snapshot = board_watcher.snapshot()
+                seq = snapshot["seq"]
+                yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            elif not changes:
+                yield ": keepalive\n\n"
+            for change in changes or []:
+                yield f"event: {change['type']}\ndata: {json.dumps(change)}\n\n"
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- Serial Monitor ---
+
+@app.route("/api/serial/stream")
+def stream_serial():
+    """Streams a serial port as Server-Sent Events, batching output every few milliseconds."""
+    port = request.args.get("port")
+    baudrate = request.args.get("baud", default=9600, type=int)
+    if not port:
+        return jsonify({"error": True, "message": "A serial port is required."}), 400
+    if not serial_monitor.available:
+        return jsonify({"error": True, "message": "Serial monitor unavailable: pyserial is not installed."}), 501
+    subscription = serial_monitor.subscribe(port, baudrate)
+
+    def events():
+        try:
+            while not subscription.closed:
+                batch = subscription.next_batch()
+                if batch:
+                    yield f"data: {json.dumps(batch)}\n\n"
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            serial_monitor.unsubscribe(port, subscription)
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- Build Cache ---
+
+@app.route("/api/build-cache/stats")
+def get_build_cache_stats():
+    return jsonify(build_cache.stats())
+
+@app.route("/api/build-cache/artifacts/<key>/<name>")
+def get_build_artifact(key, name):
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        return jsonify({"error": True, "message": "Invalid cache key."}), 400
+    return send_from_directory(build_cache.artifact_dir(key), name, as_attachment=True)
 
 # --- Board and Core Management ---
 
 @app.route("/api/boards")
 def get_boards():
-    return jsonify(cli.board_list_all())
+    return cached_json("boards", cli.board_list_all)
+
+@app.route("/api/boards/catalog")
+def get_board_catalog():
+    offset = max(0, request.args.get("offset", default=0, type=int))
+    limit = request.args.get("limit", type=int)
+    if limit is not None:
+        limit = max(1, min(limit, 1000))
+    return etag_json(board_catalog.query(
+        vendor=request.args.get("vendor"), arch=request.args.get("arch"),
+        text=request.args.get("q"), offset=offset, limit=limit,
+    ))
+
+@app.route("/api/boards/search")
+def search_boards():
+    prefix = request.args.get("prefix")
+    if not prefix:
+        return jsonify({"error": True, "message": "A search prefix is required."}), 400
+    limit = max(1, min(request.args.get("limit", default=20, type=int), 200))
+    return etag_json(board_catalog.search(prefix, limit))
+
+@app.route("/api/boards/details")
+def get_board_details():
+    fqbn = request.args.get("fqbn")
+    if not fqbn:
+        return jsonify({"error": True, "message": "An FQBN is required."}), 400
+    board = board_catalog.details(fqbn)
+    if board is None:
+        return jsonify({"error": True, "message": f"Unknown board: {fqbn}"}), 404
+    return etag_json(board)
 
 @app.route("/api/cores/installed")
 def get_installed_cores():
-    return jsonify(cli.core_list())
+    return cached_json("cores", cli.core_list)
+
+@app.route("/api/cores/install", methods=['POST'])
+def install_core():
+    core_name = request.json.get("name")
+    if not core_name:
+        return jsonify({"error": True, "message": "Core name is required"}), 400
+    return jsonify(cli.core_install(core_name))
+
+@app.route("/api/cores/uninstall", methods=['POST'])
+def uninstall_core():
+    core_name = request.json.get("name")
+    if not core_name:
+        return jsonify({"error": True, "message": "Core name is required"}), 400
+    return jsonify(cli.core_uninstall(core_name))
 
 # --- Library Management ---
 
@@ -180,7 +512,17 @@ def search_libraries():
     query = request.args.get("query")
     if not query:
         return jsonify({"error": True, "message": "A search query is required."}), 400
-    return jsonify(cli.lib_search(query))
+    if not library_index.available():
+        return jsonify(cli.lib_search(query))
+
+    page = request.args.get("page", default=1, type=int)
+    per_page = min(request.args.get("per_page", default=20, type=int), 100)
+    installed_data = metadata_cache.get("libraries", cli.list_libs).data
+    installed = {
+        lib['library']['name']: lib['library'].get('version')
+        for lib in installed_data.get('installed_libraries') or [] if 'library' in lib
+    }
+    return jsonify(library_index.search(query, page, per_page, installed))
 
 @app.route("/api/libraries/install", methods=['POST'])
 def install_library():
@@ -191,11 +533,11 @@ def install_library():
 
 @app.route("/api/libraries/installed")
 def get_installed_libraries():
-    return jsonify(cli.list_libs())
+    return cached_json("libraries", cli.list_libs)
 
 
 if __name__ == "__main__":
-    if SKETCHBOOK_PATH:
+    if get_sketchbook_path():
         print(f"--- Running in debug mode. Sketchbook: {SKETCHBOOK_PATH.as_posix()} ---")
         app.run(host='0.0.0.0', port=8080, debug=True)
     else:
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import threading
+import time
+
+
+class CacheEntry:
+    """A cached CLI result together with its serialized JSON body and ETag."""
+
+    def __init__(self, data, ttl):
+        self.data = data
+        self.body = json.dumps(data).encode("utf-8")
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.expires = time.monotonic() + ttl
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+class MetadataCache:
+    """
+    TTL cache for slow-changing arduino-cli listings (boards, cores, libraries,
+    sketches). Concurrent misses for the same key share a single loader call,
+    and `invalidate` drops entries after an install or a new sketch.
+    """
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+        # Bumped on invalidation so a load that started earlier can't store stale data.
+        self._generations = {}
+
+    def get(self, key, loader):
+        """Returns the CacheEntry for `key`, calling `loader()` at most once per miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > time.monotonic():
+                return entry
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                generation = self._generations.get(key, 0)
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.entry
+
+        try:
+            flight.entry = CacheEntry(loader(), self.ttl)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None and self._cacheable(flight.entry.data) \
+                        and self._generations.get(key, 0) == generation:
+                    self._entries[key] = flight.entry
+            flight.event.set()
+        return flight.entry
+
+    def invalidate(self, *keys):
+        """Drops the given keys, or everything when called without arguments."""
+        with self._lock:
+            for key in keys or set(self._entries) | set(self._inflight):
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _cacheable(self, data):
+        # Never pin a failed CLI call; the next request should retry it.
+        return not (isinstance(data, dict) and data.get("error"))
@@ -0,0 +1,245 @@
+import codecs
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import serial
+except ImportError:  # pyserial is optional; without it the monitor is disabled.
+    serial = None
+
+
+def open_serial(port, baudrate):
+    return serial.Serial(port, baudrate, timeout=0.05)
+
+
+class Subscription:
+    """
+    One client's view of a port. The reader never blocks on it: once more than
+    `max_bytes` are pending, the oldest chunks are dropped and counted so a slow
+    client sees a gap instead of stalling everyone else.
+    """
+
+    def __init__(self, max_bytes=256 * 1024):
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self.closed = False
+        self._pending = deque()
+        self._pending_bytes = 0
+        self._cond = threading.Condition()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def push(self, frame):
+        kind, _, payload = frame
+        with self._cond:
+            self._pending.append(frame)
+            if kind == "data":
+                self._pending_bytes += len(payload)
+                while self._pending_bytes > self.max_bytes and len(self._pending) > 1:
+                    old_kind, _, old_payload = self._pending.popleft()
+                    if old_kind == "data":
+                        self._pending_bytes -= len(old_payload)
+                        self.dropped += len(old_payload)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def next_batch(self, timeout=15.0, linger=0.05):
+        """
+        Waits up to `timeout` for output, then lingers `linger` seconds so bursts
+        at high baud rates go out as one message. Returns a list of
+        {"type": "data"|"status", "t": ..., ...} dicts (empty on timeout).
+        """
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return []
+        time.sleep(linger)
+        with self._cond:
+            frames, self._pending = list(self._pending), deque()
+            self._pending_bytes = 0
+            dropped, self.dropped = self.dropped, 0
+
+        batch = []
+        for kind, timestamp, payload in frames:
+            if kind == "data":
+                text = self._decoder.decode(payload)
+                if batch and batch[-1]["type"] == "data":
+                    batch[-1]["data"] += text
+                else:
+                    batch.append({"type": "data", "t": timestamp, "data": text})
+            else:
+                batch.append({"type": "status", "t": timestamp, "message": payload})
+        if dropped:
+            batch.append({"type": "status", "t": time.time(), "message": f"{dropped} bytes dropped (client too slow)"})
+        return batch
+
+
+class PortReader:
+    """
+    Owns one serial port: a background thread reads it into a bounded,
+    timestamped ring buffer and fans every chunk out to the subscriptions.
+    `pause()` closes the port (e.g. for an upload) until `resume()`; with
+    `paused=True` the reader starts that way and leaves the port alone.
+    """
+
+    def __init__(self, port, baudrate, buffer_frames=2048, opener=open_serial, paused=False):
+        self.port = port
+        self.baudrate = baudrate
+        self.opener = opener
+        self.ring = deque(maxlen=buffer_frames)
+        self.subscriptions = set()
+        self._lock = threading.Lock()
+        self._serial = None
+        self._stopped = threading.Event()
+        self._active = threading.Event()
+        self._released = threading.Event()
+        if paused:
+            self._publish("status", f"{port} is busy (upload in progress)")
+        else:
+            self._active.set()
+        self._thread = threading.Thread(target=self._run, name=f"serial-{port}", daemon=True)
+        self._thread.start()
+
+    def subscribe(self, subscription, replay=True):
+        with self._lock:
+            if replay:
+                for frame in self.ring:
+                    subscription.push(frame)
+            self.subscriptions.add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.subscriptions.discard(subscription)
+            return len(self.subscriptions)
+
+    def pause(self, timeout=5.0):
+        """Closes the port and keeps it closed until resume(); waits for the release."""
+        self._released.clear()
+        self._active.clear()
+        self._released.wait(timeout)
+
+    def resume(self):
+        self._active.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._active.set()
+        self._thread.join(timeout=2.0)
+        with self._lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.close()
+
+    def _publish(self, kind, payload):
+        frame = (kind, time.time(), payload)
+        with self._lock:
+            self.ring.append(frame)
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.push(frame)
+
+    def _close(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except OSError:
+                pass
+            self._serial = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if not self._active.is_set():
+                if self._serial is not None:
+                    self._close()
+                    self._publish("status", f"{self.port} released")
+                self._released.set()
+                self._active.wait(0.2)
+                continue
+
+            if self._serial is None:
+                try:
+                    self._serial = self.opener(self.port, self.baudrate)
+                except (OSError, ValueError) as e:  # SerialException subclasses OSError.
+                    self._publish("status", f"Cannot open {self.port}: {e}")
+                    self._stopped.wait(1.0)
+                    continue
+                self._publish("status", f"{self.port} opened at {self.baudrate} baud")
+
+            try:
+                if self._serial.baudrate != self.baudrate:
+                    self._serial.baudrate = self.baudrate
+                data = self._serial.read(self._serial.in_waiting or 1)
+            except (OSError, ValueError) as e:
+                self._close()
+                self._publish("status", f"{self.port} disconnected: {e}")
+                continue
+            if data:
+                self._publish("data", data)
+        self._close()
+
+
+class SerialMonitor:
+    """Keeps one PortReader per port, shared by every subscriber of that port."""
+
+    def __init__(self, opener=None, buffer_frames=2048, max_pending_bytes=256 * 1024):
+        self.opener = opener or (open_serial if serial is not None else None)
+        self.buffer_frames = buffer_frames
+        self.max_pending_bytes = max_pending_bytes
+        self._readers = {}
+        self._released = {}  # port -> released() blocks in progress
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.opener is not None
+
+    def subscribe(self, port, baudrate=9600):
+        with self._lock:
+            reader = self._readers.get(port)
+            if reader is None:
+                # A reader created during an upload must not open the port under it.
+                reader = self._readers[port] = PortReader(
+                    port, baudrate, self.buffer_frames, self.opener, paused=port in self._released,
+                )
+            else:
+                reader.baudrate = baudrate  # The latest subscriber's baud rate wins.
+        subscription = Subscription(self.max_pending_bytes)
+        reader.subscribe(subscription)
+        return subscription
+
+    def unsubscribe(self, port, subscription):
+        with self._lock:
+            reader = self._readers.get(port)
+            if reader is None or reader.unsubscribe(subscription):
+                return
+            del self._readers[port]
+        reader.stop()
+
+    @contextmanager
+    def released(self, port):
+        """
+        Frees `port` for the duration of the block (e.g. an upload), then
+        reopens it. Readers created meanwhile start paused, and the reader
+        present at the end is the one resumed.
+        """
+        with self._lock:
+            self._released[port] = self._released.get(port, 0) + 1
+            reader = self._readers.get(port)
+        if reader is not None:
+            reader.pause()
+        try:
+            yield
+        finally:
+            with self._lock:
+                remaining = self._released.pop(port) - 1
+                if remaining:
+                    self._released[port] = remaining
+                reader = self._readers.get(port)
+            if reader is not None and not remaining:
+                reader.resume()
@@ -4,11 +4,12 @@
     const dom = {
         compileBtn: document.getElementById('compile-button'),
         uploadBtn: document.getElementById('upload-button'),
+        cancelBtn: document.getElementById('cancel-job-button'),
         boardSelector: document.getElementById('board-selector'),
     };
 
     async function populateBoards() {
-        const data = await App.api.get('/api/boards');
+        const data = await App.api.get('/api/boards/catalog');
         dom.boardSelector.innerHTML = '<option value="">Select Board</option>';
         if (data && data.boards) {
             data.boards.forEach(b => {
@@ -17,6 +18,33 @@
         }
     }
 
+    let currentJob = null;
+
+    // Streams a background job's output into the console until it finishes.
+    function followJob(job, prefix) {
+        if (job.error) { App.logOutput(job); return Promise.resolve(job); }
+        currentJob = job;
+        dom.cancelBtn.disabled = false;
+        return new Promise(resolve => {
+            const source = new EventSource(`/api/jobs/${job.id}/stream`);
+            source.onmessage = (event) => App.logOutput(JSON.parse(event.data).replace(/\n$/, ''), prefix);
+            source.addEventListener('done', (event) => {
+                source.close();
+                const result = JSON.parse(event.data);
+                App.logOutput(`${result.kind} ${result.status}.`, prefix);
+                currentJob = null;
+                dom.cancelBtn.disabled = true;
+                resolve(result);
+            });
+        });
+    }
+
+    async function cancelJob() {
+        if (!currentJob) return;
+        const result = await App.api.post(`/api/jobs/${currentJob.id}/cancel`, {});
+        App.logOutput(result);
+    }
+
     async function compileSketch() {
         if (!App.state.currentSketch || !App.state.selectedFqbn) {
             App.logOutput('Missing sketch or board selection for compile.');
@@ -24,11 +52,11 @@
         }
         await App.Editor.saveCurrentFile(); 
         App.logOutput(`Compiling sketch: ${App.state.currentSketch.name}...`);
-        const result = await App.api.post('/api/compile', { 
+        const job = await App.api.post('/api/compile', { 
             fqbn: App.state.selectedFqbn, 
             sketch_path: App.state.currentSketch.path 
         });
-        App.logOutput(result);
+        await followJob(job, 'Compile');
     }
 
     async function uploadSketch() {
@@ -37,7 +65,9 @@
             return;
         }
 
-        const port = prompt("Enter serial port (e.g., COM3 or /dev/ttyUSB0):", "");
+        const ports = await App.api.get('/api/ports');
+        const detected = (ports.ports || []).map(p => p.port.address);
+        const port = prompt("Enter serial port (e.g., COM3 or /dev/ttyUSB0):", detected[0] || "");
         if (!port) {
             App.logOutput("Upload cancelled.");
             return;
@@ -45,17 +75,18 @@
 
         await App.Editor.saveCurrentFile();
         App.logOutput(`Uploading sketch: ${App.state.currentSketch.name}...`);
-        const result = await App.api.post('/api/upload', {
+        const job = await App.api.post('/api/upload', {
             fqbn: App.state.selectedFqbn, 
             port: port, 
             sketch_path: App.state.currentSketch.path
         });
-        App.logOutput(result);
+        await followJob(job, 'Upload');
     }
 
     App.Actions.init = () => {
         dom.compileBtn.addEventListener('click', compileSketch);
         dom.uploadBtn.addEventListener('click', uploadSketch);
+        dom.cancelBtn.addEventListener('click', cancelJob);
         dom.boardSelector.addEventListener('change', () => {
             App.state.selectedFqbn = dom.boardSelector.value;
         });
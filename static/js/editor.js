@@ -51,18 +51,38 @@
         const data = await App.api.get(`/api/sketch/file/content?path=${encodeURIComponent(filePath)}`);
         if (data.error) { App.logOutput(data); return; }
         App.state.openFiles[filePath] = data.content;
+        App.state.fileVersions[filePath] = data.version;
         if (makeActive) setActiveFile(filePath);
     }
 
+    // Smallest single replacement turning oldText into newText (common prefix/suffix trimmed).
+    function computePatch(oldText, newText) {
+        let start = 0;
+        const maxStart = Math.min(oldText.length, newText.length);
+        while (start < maxStart && oldText[start] === newText[start]) start++;
+        let oldEnd = oldText.length, newEnd = newText.length;
+        while (oldEnd > start && newEnd > start && oldText[oldEnd - 1] === newText[newEnd - 1]) { oldEnd--; newEnd--; }
+        return { start, end: oldEnd, text: newText.slice(start, newEnd) };
+    }
+
     async function saveCurrentFile() {
         if (!App.state.activeFile) return;
+        const filePath = App.state.activeFile;
         const content = codeEditor.getValue();
-        if (content === App.state.openFiles[App.state.activeFile]) return; 
-
-        App.logOutput(`Saving ${App.state.activeFile.split('/').pop()}...`, 'Editor');
-        const result = await App.api.put('/api/sketch/file/content', { path: App.state.activeFile, content });
+        if (content === App.state.openFiles[filePath]) return; 
+
+        App.logOutput(`Saving ${filePath.split('/').pop()}...`, 'Editor');
+        // Only the changed range is sent; the server rejects it if the file changed since we loaded it.
+        const result = await App.api.patch('/api/sketch/file/content', {
+            path: filePath,
+            base_version: App.state.fileVersions[filePath],
+            patches: [computePatch(App.state.openFiles[filePath], content)],
+        });
         App.logOutput(result);
-        if (!result.error) App.state.openFiles[App.state.activeFile] = content;
+        if (!result.error) {
+            App.state.openFiles[filePath] = content;
+            App.state.fileVersions[filePath] = result.version;
+        }
     }
 
     async function createNewFile() {
@@ -88,6 +108,7 @@
         if (!result.error) {
             const deletedPath = App.state.activeFile;
             delete App.state.openFiles[deletedPath];
+            delete App.state.fileVersions[deletedPath];
             App.state.activeFile = null;
             codeEditor.setValue('');
 
@@ -115,7 +136,9 @@
         if (!result.error) {
             const newPath = oldPath.substring(0, oldPath.lastIndexOf('/') + 1) + newName;
             App.state.openFiles[newPath] = App.state.openFiles[oldPath];
+            App.state.fileVersions[newPath] = App.state.fileVersions[oldPath];
             delete App.state.openFiles[oldPath];
+            delete App.state.fileVersions[oldPath];
             App.state.activeFile = newPath;
             renderFileList();
             renderFileTabs();
@@ -124,16 +147,18 @@
     }
 
     App.Editor.loadAllFiles = async (sketchPath) => {
-        const data = await App.api.get(`/api/sketch/files?path=${encodeURIComponent(sketchPath)}`);
+        // One request for every file; the browser revalidates it with the workspace ETag.
+        const data = await App.api.get(`/api/sketch/workspace?path=${encodeURIComponent(sketchPath)}`);
         if (data.error) { App.logOutput(data); return; }
 
-        for (const fileName of data.files) {
-            const filePath = `${sketchPath}/${fileName}`;
-            await openFile(filePath, false); // open without making it active yet
+        for (const file of data.files) {
+            const filePath = `${sketchPath}/${file.name}`;
+            App.state.openFiles[filePath] = file.content;
+            App.state.fileVersions[filePath] = file.version;
         }
 
         if (data.files.length > 0) {
-            const firstFilePath = `${sketchPath}/${data.files[0]}`;
+            const firstFilePath = `${sketchPath}/${data.files[0].name}`;
             setActiveFile(firstFilePath);
         }
 
@@ -20,12 +20,15 @@
             data.libraries.forEach(lib => {
                 // Correctly access the properties based on the user-provided JSON structure
                 const card = App.createCard(
-                    lib.name, 
+                    lib.installed ? `${lib.name} (installed ${lib.installed_version})` : lib.name, 
                     lib.latest.sentence, 
                     () => installLibrary(lib.name)
                 );
                 dom.librarySearchResults.appendChild(card);
             });
+            if (data.total !== undefined) {
+                App.logOutput(`Showing ${data.libraries.length} of ${data.total} results.`, 'Library');
+            }
         } else {
             App.logOutput('No libraries found or an error occurred.', 'Library');
         }
@@ -8,6 +8,7 @@ window.App = {
         sketchbookPath: null,
         currentSketch: null, 
         openFiles: {}, 
+        fileVersions: {}, 
         activeFile: null, 
         selectedFqbn: null,
     },
@@ -16,6 +17,7 @@ window.App = {
         get: (endpoint) => fetch(endpoint).then(res => res.json()),
         post: (endpoint, body) => fetch(endpoint, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(body) }).then(res => res.json()),
         put: (endpoint, body) => fetch(endpoint, { method: 'PUT', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(body) }).then(res => res.json()),
+        patch: (endpoint, body) => fetch(endpoint, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(body) }).then(res => res.json()),
         delete: (endpoint, body) => fetch(endpoint, { method: 'DELETE', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(body) }).then(res => res.json()),
     },
     // Namespaces for other modules to attach their functions to
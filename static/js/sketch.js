@@ -15,6 +15,7 @@
         App.logOutput(`Loading sketch: ${sketch.name}...`);
         App.state.currentSketch = sketch;
         App.state.openFiles = {};
+        App.state.fileVersions = {};
         App.state.activeFile = null;
 
         // Hand off to the editor module to load files
@@ -0,0 +1,61 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FAKE_CLI = REPO_DIR / "benchmarks" / "fake_arduino_cli.py"
+
+# The app is a flat set of modules at the repository root.
+sys.path.insert(0, str(REPO_DIR))
+
+
+def write_fake_cli(directory):
+    """Writes an `arduino-cli` into `directory` that runs the benchmark's fake CLI."""
+    wrapper = Path(directory) / "arduino-cli"
+    wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CLI}" "$@"\n')
+    wrapper.chmod(0o755)
+    return wrapper
+
+
+@pytest.fixture(scope="session")
+def app_env(tmp_path_factory):
+    """
+    Imports `main` against the fake CLI, with a temporary sketchbook, data dir
+    and build cache. The app looks these up once per process, so they are
+    shared by every test that uses the app.
+    """
+    root = tmp_path_factory.mktemp("app")
+    bin_dir, sketchbook, data_dir = root / "bin", root / "sketchbook", root / "data"
+    for directory in (bin_dir, sketchbook, data_dir):
+        directory.mkdir()
+    write_fake_cli(bin_dir)
+    os.environ.update({
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "FAKE_CLI_DELAY": "0",
+        "FAKE_CLI_COMPILE_DELAY": "0.1",
+        "FAKE_CLI_SKETCHBOOK": str(sketchbook),
+        "FAKE_CLI_DATA": str(data_dir),
+        "BUILD_CACHE_DIR": str(root / "build-cache"),
+    })
+    import main
+    yield main, sketchbook
+    main.board_watcher.stop()
+
+
+@pytest.fixture
+def app(app_env):
+    main, sketchbook = app_env
+    main.metadata_cache.invalidate()
+    return main
+
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
+
+
+@pytest.fixture
+def sketchbook(app_env):
+    return app_env[1]
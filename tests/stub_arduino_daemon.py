@@ -0,0 +1,77 @@
+"""
+Minimal `arduino-cli daemon` for the daemon backend tests:
+
+    stub_arduino_daemon.py daemon --port PORT
+
+Serves a stub ArduinoCoreService with fixed listings. Every call is appended
+to the file named by STUB_DAEMON_LOG. A library search for "unavailable"
+fails with UNAVAILABLE, as if the daemon went away mid-call, and Init takes
+STUB_DAEMON_INIT_DELAY seconds (default 0) like a slow index load.
+"""
+import os
+import sys
+import time
+from concurrent import futures
+
+import grpc
+
+from stub_rpc.commands_pb2_grpc import add_servicer_to_server
+
+BOARDS = [
+    {"name": "Arduino Uno", "fqbn": "arduino:avr:uno"},
+    {"name": "Arduino Nano", "fqbn": "arduino:avr:nano"},
+]
+
+
+class StubCoreService:
+    def _log(self, name, request):
+        with open(os.environ["STUB_DAEMON_LOG"], "a", encoding="utf-8") as log:
+            log.write(f"{name} {request.get('search_args', '')}\n")
+
+    def Create(self, request, context):
+        self._log("Create", request)
+        return {"instance": {"id": 1}}
+
+    def Init(self, request, context):
+        self._log("Init", request)
+        time.sleep(float(os.environ.get("STUB_DAEMON_INIT_DELAY", 0)))
+        yield {"message": "loading indexes"}
+
+    def BoardListAll(self, request, context):
+        self._log("BoardListAll", request)
+        return {"boards": BOARDS}
+
+    def BoardList(self, request, context):
+        self._log("BoardList", request)
+        return {"ports": [{"port": {"address": "/dev/ttyACM0"}, "matching_boards": BOARDS[:1]}]}
+
+    def PlatformSearch(self, request, context):
+        self._log("PlatformSearch", request)
+        return {"search_output": [
+            {"metadata": {"id": "arduino:avr"}, "installed_version": "1.8.6", "latest_version": "1.8.6"},
+            {"metadata": {"id": "esp32:esp32"}, "latest_version": "3.0.0"},
+        ]}
+
+    def LibraryList(self, request, context):
+        self._log("LibraryList", request)
+        return {"installed_libraries": [{"library": {"name": "Servo", "version": "1.2.1"}}]}
+
+    def LibrarySearch(self, request, context):
+        self._log("LibrarySearch", request)
+        if request.get("search_args") == "unavailable":
+            context.abort(grpc.StatusCode.UNAVAILABLE, "daemon is shutting down")
+        return {"libraries": [{"name": request.get("search_args")}]}
+
+
+def main(argv):
+    port = argv[argv.index("--port") + 1]
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    add_servicer_to_server(StubCoreService(), server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    while True:
+        time.sleep(3600)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
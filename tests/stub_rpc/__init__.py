@@ -0,0 +1,5 @@
+"""
+Stand-in for the Python stubs generated from arduino-cli's `rpc/` protos.
+Messages are `google.protobuf.Struct`s, so a stub `ArduinoCoreService` can be
+served over a real gRPC channel without compiling the protos.
+"""
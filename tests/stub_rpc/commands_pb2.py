@@ -0,0 +1,10 @@
+from google.protobuf import json_format, struct_pb2
+
+
+def _message(**fields):
+    return json_format.ParseDict(fields, struct_pb2.Struct())
+
+
+CreateRequest = InitRequest = _message
+BoardListAllRequest = BoardListRequest = PlatformSearchRequest = _message
+LibraryListRequest = LibrarySearchRequest = _message
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import grpc
+from google.protobuf import json_format, struct_pb2
+
+SERVICE = "cc.arduino.cli.commands.v1.ArduinoCoreService"
+UNARY_METHODS = ("BoardListAll", "BoardList", "PlatformSearch", "LibraryList", "LibrarySearch")
+
+
+def _to_dict(message):
+    return json_format.MessageToDict(message)
+
+
+def _from_dict(data):
+    return json_format.ParseDict(data, struct_pb2.Struct())
+
+
+def _create_response(data):
+    return SimpleNamespace(instance=_to_dict(struct_pb2.Struct.FromString(data))["instance"])
+
+
+class ArduinoCoreServiceStub:
+    def __init__(self, channel):
+        def method(name, kind=channel.unary_unary, deserializer=struct_pb2.Struct.FromString):
+            return kind(f"/{SERVICE}/{name}", request_serializer=struct_pb2.Struct.SerializeToString, response_deserializer=deserializer)
+
+        self.Create = method("Create", deserializer=_create_response)
+        self.Init = method("Init", kind=channel.unary_stream)
+        for name in UNARY_METHODS:
+            setattr(self, name, method(name))
+
+
+def add_servicer_to_server(servicer, server):
+    """
+    Serves `servicer`, whose methods take the request as a dict and return the
+    response as a dict (`Init` yields dicts).
+    """
+    def unary(name):
+        def handle(request, context):
+            return _from_dict(getattr(servicer, name)(_to_dict(request), context))
+        return grpc.unary_unary_rpc_method_handler(handle, struct_pb2.Struct.FromString, struct_pb2.Struct.SerializeToString)
+
+    def init(request, context):
+        for progress in servicer.Init(_to_dict(request), context):
+            yield _from_dict(progress)
+
+    handlers = {name: unary(name) for name in ("Create",) + UNARY_METHODS}
+    handlers["Init"] = grpc.unary_stream_rpc_method_handler(init, struct_pb2.Struct.FromString, struct_pb2.Struct.SerializeToString)
+    server.add_generic_rpc_handlers([grpc.method_handlers_generic_handler(SERVICE, handlers)])
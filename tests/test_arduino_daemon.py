@@ -0,0 +1,176 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("grpc")
+
+from arduino_daemon import DaemonBackend  # noqa: E402
+
+TESTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(TESTS_DIR))  # Makes `stub_rpc` importable as the stubs module.
+
+# grpc's connectivity poller may still be running for a moment after a channel
+# is closed and reports that from its own thread; it is harmless.
+pytestmark = pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+
+
+class RecordingFallback:
+    name = "subprocess"
+
+    def __init__(self):
+        self.calls = []
+
+    def run(self, command, parse_json=False):
+        self.calls.append(command)
+        return {"fallback": command}
+
+    def close(self):
+        pass
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def daemon_cli(tmp_path, monkeypatch):
+    """An `arduino-cli` whose `daemon` subcommand starts the stub service."""
+    log = tmp_path / "calls.log"
+    log.touch()
+    monkeypatch.setenv("STUB_DAEMON_LOG", str(log))
+    cli = tmp_path / "arduino-cli"
+    cli.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{TESTS_DIR / "stub_arduino_daemon.py"}" "$@"\n')
+    cli.chmod(0o755)
+    return cli, log
+
+
+@pytest.fixture
+def backend(daemon_cli):
+    cli, _ = daemon_cli
+    fallback = RecordingFallback()
+    backend = DaemonBackend(str(cli), fallback, stubs_module="stub_rpc", health_interval=0.2)
+    yield backend
+    backend.close()
+
+
+def calls(log, name):
+    return [line for line in log.read_text().splitlines() if line.split(" ")[0] == name]
+
+
+def test_handlers_answer_from_the_daemon(backend):
+    assert backend.run(["board", "listall"], parse_json=True)["boards"][0]["fqbn"] == "arduino:avr:uno"
+    assert backend.run(["board", "list"], parse_json=True)["detected_ports"][0]["port"]["address"] == "/dev/ttyACM0"
+    assert backend.run(["core", "list"], parse_json=True)["platforms"] == [
+        {"id": "arduino:avr", "installed_version": "1.8.6", "latest_version": "1.8.6", "releases": {}},
+    ]
+    assert backend.run(["lib", "list"], parse_json=True)["installed_libraries"][0]["library"]["name"] == "Servo"
+    assert backend.run(["lib", "search", "servo"], parse_json=True) == {"libraries": [{"name": "servo"}]}
+    assert backend.fallback.calls == []
+    assert backend.restarts == 1
+
+
+def test_unmapped_commands_use_the_fallback(backend):
+    assert backend.run(["compile", "--fqbn", "arduino:avr:uno", "Blink"]) == {"fallback": ["compile", "--fqbn", "arduino:avr:uno", "Blink"]}
+    assert backend.run(["board", "listall"]) == {"fallback": ["board", "listall"]}
+    assert backend.restarts == 0  # Nothing needed the daemon yet.
+
+
+def test_installs_reinitialize_the_instance(backend, daemon_cli):
+    _, log = daemon_cli
+    backend.run(["lib", "list"], parse_json=True)
+    backend.run(["lib", "install", "Servo"])
+    assert backend.fallback.calls == [["lib", "install", "Servo"]]
+    assert len(calls(log, "Init")) == 2
+
+
+def test_restarts_a_dead_daemon_on_next_call(backend):
+    backend.run(["lib", "list"], parse_json=True)
+    backend.close()  # Stops the supervisor so only the call path restarts it.
+    backend._stopped.clear()
+    assert backend.run(["lib", "list"], parse_json=True)["installed_libraries"]
+    assert backend.restarts == 2
+    assert backend.fallback.calls == []
+
+
+def test_supervisor_restarts_a_crashed_daemon(backend):
+    backend.run(["lib", "list"], parse_json=True)
+    backend._process.kill()
+    wait_for(lambda: backend.restarts == 2 and backend.healthy())
+    assert backend.run(["lib", "list"], parse_json=True)["installed_libraries"]
+
+
+def test_unavailable_mid_call_falls_back_and_restarts(backend):
+    assert backend.run(["lib", "search", "unavailable"], parse_json=True) == {"fallback": ["lib", "search", "unavailable"]}
+    assert backend.run(["lib", "search", "servo"], parse_json=True) == {"libraries": [{"name": "servo"}]}
+    assert backend.restarts == 2
+
+
+def test_teardown_between_session_and_call_falls_back(backend, monkeypatch):
+    session = backend._session
+
+    def session_then_shutdown():
+        snapshot = session()
+        backend._mark_dead()  # The supervisor wins the race.
+        return snapshot
+
+    monkeypatch.setattr(backend, "_session", session_then_shutdown)
+    assert backend.run(["board", "listall"], parse_json=True) == {"fallback": ["board", "listall"]}
+
+
+def test_missing_cli_falls_back(tmp_path):
+    fallback = RecordingFallback()
+    backend = DaemonBackend(str(tmp_path / "missing"), fallback, stubs_module="stub_rpc")
+    try:
+        assert backend.run(["lib", "list"], parse_json=True) == {"fallback": ["lib", "list"]}
+        assert not backend.ensure_running()
+    finally:
+        backend.close()
+
+
+def test_missing_stubs_fall_back(daemon_cli):
+    cli, _ = daemon_cli
+    backend = DaemonBackend(str(cli), RecordingFallback(), stubs_module="not_generated")
+    assert backend.run(["lib", "list"], parse_json=True) == {"fallback": ["lib", "list"]}
+
+
+def timed(call):
+    start = time.monotonic()
+    result = call()
+    return result, time.monotonic() - start
+
+
+def test_calls_fall_back_while_the_daemon_loads_indexes(backend, daemon_cli, monkeypatch):
+    monkeypatch.setenv("STUB_DAEMON_INIT_DELAY", "1.5")
+    starter = threading.Thread(target=backend.ensure_running)
+    starter.start()
+    wait_for(lambda: backend._busy)
+    result, elapsed = timed(lambda: backend.run(["lib", "list"], parse_json=True))
+    assert result == {"fallback": ["lib", "list"]} and elapsed < 0.5
+    starter.join()
+
+    assert backend.run(["lib", "list"], parse_json=True)["installed_libraries"]
+    reinit = threading.Thread(target=backend.run, args=(["lib", "install", "Servo"],))
+    reinit.start()
+    wait_for(lambda: backend._busy)
+    result, elapsed = timed(lambda: backend.run(["core", "list"], parse_json=True))
+    assert result == {"fallback": ["core", "list"]} and elapsed < 0.5
+    reinit.join()
+    assert backend.run(["core", "list"], parse_json=True)["platforms"]
+
+
+def test_init_that_overruns_its_deadline_falls_back(daemon_cli, monkeypatch):
+    cli, _ = daemon_cli
+    monkeypatch.setenv("STUB_DAEMON_INIT_DELAY", "5")
+    backend = DaemonBackend(str(cli), RecordingFallback(), stubs_module="stub_rpc", init_timeout=0.5)
+    try:
+        result, elapsed = timed(lambda: backend.run(["lib", "list"], parse_json=True))
+        assert result == {"fallback": ["lib", "list"]} and elapsed < 4
+        assert backend._process is None and backend.restarts == 0
+    finally:
+        backend.close()
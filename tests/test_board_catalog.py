@@ -0,0 +1,94 @@
+from board_catalog import BoardCatalog
+
+
+class Listings:
+    """Stands in for the cached `core list` / `board listall` / `board details` calls."""
+
+    def __init__(self):
+        self.cores = {"arduino:avr": "1.8.6"}
+        self.boards = {"arduino:avr": [("Arduino Uno", "uno"), ("Arduino Nano", "nano")]}
+        self.fail_boards = False
+        self.fresh_loads = 0
+
+    def load_cores(self):
+        return {"platforms": [{"id": pid, "installed_version": version} for pid, version in self.cores.items()]}
+
+    def load_boards(self, fresh=False):
+        self.fresh_loads += fresh
+        if self.fail_boards:
+            return {"error": True, "message": "busy"}
+        return {"boards": [
+            {"name": name, "fqbn": f"{pid}:{board_id}", "platform": {"metadata": {"id": pid}}}
+            for pid in self.cores for name, board_id in self.boards.get(pid, [])
+        ]}
+
+    def load_details(self, fqbn):
+        return {"fqbn": fqbn, "config_options": []}
+
+    def catalog(self):
+        return BoardCatalog(self.load_boards, self.load_cores, self.load_details)
+
+
+def test_query_search_and_details():
+    catalog = Listings().catalog()
+    assert catalog.query(vendor="arduino")["total"] == 2
+    assert [b["fqbn"] for b in catalog.search("nan")["boards"]] == ["arduino:avr:nano"]
+    assert catalog.details("arduino:avr:uno:cpu=atmega328")["details"]["fqbn"] == "arduino:avr:uno:cpu=atmega328"
+    assert catalog.details("arduino:avr:missing") is None
+
+
+def test_failed_first_load_is_retried():
+    listings = Listings()
+    listings.fail_boards = True
+    catalog = listings.catalog()
+    assert catalog.query()["total"] == 0
+    listings.fail_boards = False
+    assert catalog.query()["total"] == 2
+
+
+def test_failed_load_after_an_upgrade_is_retried():
+    listings = Listings()
+    catalog = listings.catalog()
+    version = catalog.query()["version"]
+
+    listings.cores["esp32:esp32"] = "3.0.0"
+    listings.boards["esp32:esp32"] = [("ESP32 Dev Module", "esp32")]
+    listings.fail_boards = True
+    result = catalog.query()
+    assert (result["version"], result["total"]) == (version, 2)  # The old boards are still served.
+
+    listings.fail_boards = False
+    result = catalog.query()
+    assert result["total"] == 3 and result["version"] != version
+    assert catalog.by_fqbn["esp32:esp32:esp32"]["version"] == "3.0.0"
+
+
+def test_platform_change_reloads_a_stale_board_listing():
+    listings = Listings()
+    load_boards = listings.load_boards
+    cached = load_boards()
+
+    def cached_boards(fresh=False):
+        # Like the metadata cache: the listing only changes when asked for fresh.
+        nonlocal cached
+        if fresh:
+            cached = load_boards(fresh=True)
+        return cached
+
+    catalog = BoardCatalog(cached_boards, listings.load_cores, listings.load_details)
+    assert catalog.query()["total"] == 2
+
+    listings.cores["esp32:esp32"] = "3.0.0"  # Installed outside the app.
+    listings.boards["esp32:esp32"] = [("ESP32 Dev Module", "esp32")]
+    assert catalog.query()["total"] == 3
+    assert "esp32:esp32:esp32" in catalog.by_fqbn
+
+
+def test_limits_are_clamped(client):
+    total = client.get("/api/boards/catalog").get_json()["total"]
+    assert total > 1
+    for limit, expected in ((-1, 1), (0, 1), (2, 2)):
+        assert len(client.get(f"/api/boards/catalog?limit={limit}").get_json()["boards"]) == expected
+    assert len(client.get("/api/boards/catalog").get_json()["boards"]) == total
+    assert len(client.get("/api/boards/search?prefix=board&limit=-5").get_json()["boards"]) == 1
+    assert len(client.get("/api/boards/search?prefix=board&limit=1000").get_json()["boards"]) == 200
@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+
+from arduino_cli import ArduinoCLI
+from board_watcher import BoardWatcher, cli_watch_source
+from conftest import write_fake_cli
+
+UNO = {"address": "/dev/ttyACM0", "protocol": "serial"}
+NANO = {"address": "/dev/ttyUSB0", "protocol": "serial"}
+
+
+class StubSource:
+    """Feeds queued watch events; blocks like `board list --watch` until closed."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.opened = 0
+        self.closed = threading.Event()
+
+    def __call__(self):
+        self.opened += 1
+        self.closed.clear()
+        # Drop the end-of-stream marker left by the previous close().
+        pending = []
+        while not self.events.empty():
+            pending.append(self.events.get())
+        for event in pending:
+            if event is not None:
+                self.events.put(event)
+        return self
+
+    def __iter__(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            yield event
+
+    def close(self):
+        self.closed.set()
+        self.events.put(None)
+
+    def add(self, port, board="Arduino Uno"):
+        self.events.put({"eventType": "add", "port": port, "matching_boards": [{"name": board}]})
+
+    def remove(self, port):
+        self.events.put({"eventType": "remove", "port": port})
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_events_update_the_snapshot_and_log():
+    source = StubSource()
+    watcher = BoardWatcher(source)
+    watcher.start()
+    try:
+        source.add(UNO)
+        source.add(NANO, "Arduino Nano")
+        source.remove(UNO)
+        wait_for(lambda: watcher.snapshot()["seq"] == 3)
+
+        snapshot = watcher.snapshot()
+        assert [entry["port"]["address"] for entry in snapshot["ports"]] == ["/dev/ttyUSB0"]
+        assert snapshot["ports"][0]["matching_boards"] == [{"name": "Arduino Nano"}]
+
+        seq, events = watcher.wait(1)
+        assert seq == 3
+        assert [(event["type"], event["port"]["address"]) for event in events] == [
+            ("add", "/dev/ttyUSB0"), ("remove", "/dev/ttyACM0"),
+        ]
+        assert watcher.wait(3, timeout=0.05) == (3, [])
+    finally:
+        watcher.stop()
+
+
+def test_client_behind_the_log_must_resnapshot():
+    source = StubSource()
+    watcher = BoardWatcher(source, log_size=2)
+    watcher.start()
+    try:
+        for _ in range(3):
+            source.add(UNO)
+            source.remove(UNO)
+        wait_for(lambda: watcher.snapshot()["seq"] == 6)
+        assert watcher.wait(0) == (6, None)
+        assert watcher.wait(3) == (6, None)
+        assert [event["type"] for event in watcher.wait(4)[1]] == ["add", "remove"]
+    finally:
+        watcher.stop()
+
+
+def test_ended_stream_clears_ports_and_restarts():
+    source = StubSource()
+    watcher = BoardWatcher(source, restart_delay=0.05)
+    watcher.start()
+    try:
+        source.add(UNO)
+        wait_for(lambda: watcher.snapshot()["ports"])
+        source.events.put(None)  # The CLI exited.
+        wait_for(lambda: source.opened == 2)
+        assert watcher.snapshot()["ports"] == []
+        assert watcher.wait(1)[1][0]["type"] == "remove"
+    finally:
+        watcher.stop()
+
+
+def test_stop_closes_a_blocked_source():
+    source = StubSource()
+    watcher = BoardWatcher(source)
+    watcher.start()
+    wait_for(lambda: source.opened == 1)
+    watcher.stop()
+    assert source.closed.is_set()
+    assert not watcher._thread.is_alive()
+
+
+def test_stop_kills_the_watch_process(tmp_path):
+    wrapper = write_fake_cli(tmp_path)
+    watcher = BoardWatcher(cli_watch_source(ArduinoCLI(cli_path=str(wrapper))))
+    watcher.start()
+    wait_for(lambda: watcher._events is not None)
+    process = watcher._events.process
+    watcher.stop()
+    assert process.poll() is not None
+    assert not watcher._thread.is_alive()
+
+
+def test_unexpected_errors_restart_the_stream():
+    source = StubSource()
+    watcher = BoardWatcher(source, restart_delay=0.05)
+    watcher.start()
+    try:
+        source.events.put({"eventType": "add", "port": "/dev/ttyACM0"})  # apply() raises AttributeError.
+        wait_for(lambda: source.opened == 2)
+        assert watcher.snapshot()["error"]
+        assert watcher._thread.is_alive()
+        source.add(UNO)
+        wait_for(lambda: watcher.snapshot()["ports"])
+    finally:
+        watcher.stop()
@@ -0,0 +1,47 @@
+import threading
+
+from build_cache import BuildCache
+
+
+def build(cache, sketch, fqbn, key, size=4096):
+    with cache.build_dir(sketch, fqbn) as build_path:
+        (build_path / "sketch.ino.hex").write_bytes(b"x" * size)
+        return cache.store(key, {"output": "ok"}, build_path)
+
+
+def test_lookup_after_store(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    assert cache.lookup("k") is None
+    build(cache, str(tmp_path / "Blink"), "arduino:avr:uno", "k")
+    assert cache.lookup("k")["artifacts"] == ["sketch.ino.hex"]
+    assert cache.lookup("missing", record_miss=False) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_eviction_keeps_the_cache_under_its_limit(tmp_path):
+    cache = BuildCache(tmp_path / "cache", max_bytes=20000)
+    for i in range(10):
+        build(cache, str(tmp_path / f"Sketch{i}"), "arduino:avr:uno", f"key{i}")
+    assert cache.stats()["bytes"] <= 20000
+    assert cache.evictions > 0
+    assert cache.lookup("key9") is not None  # The most recent build survives.
+
+
+def test_concurrent_stores_and_evictions_do_not_raise(tmp_path):
+    cache = BuildCache(tmp_path / "cache", max_bytes=10000)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(15):
+                build(cache, str(tmp_path / f"Sketch{(n + i) % 4}"), f"arduino:avr:board{i % 3}", f"key{n}-{i}")
+                cache.stats()
+        except Exception as e:  # noqa: BLE001 - any error fails the test
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,167 @@
+import time
+
+import pytest
+
+import jobs as jobs_module
+from arduino_cli import COMMAND_ERRORS, COMMAND_SECONDS, OUTPUT_BYTES, ArduinoCLI
+from build_cache import BuildCache
+from conftest import write_fake_cli
+from jobs import JobManager
+
+
+def wait_done(*jobs, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not all(job.done for job in jobs):
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    """ArduinoCLI driving the benchmark's fake arduino-cli; compiles and uploads take ~0.2 s."""
+    monkeypatch.setenv("FAKE_CLI_DELAY", "0")
+    monkeypatch.setenv("FAKE_CLI_COMPILE_DELAY", "0.2")
+    wrapper = write_fake_cli(tmp_path)
+    return ArduinoCLI(cli_path=str(wrapper))
+
+
+@pytest.fixture
+def sketch(tmp_path):
+    path = tmp_path / "Blink"
+    path.mkdir()
+    (path / "Blink.ino").write_text("void setup() {}\nvoid loop() {}\n")
+    return str(path)
+
+
+def test_queued_uploads_do_not_hold_workers(cli, sketch):
+    jobs = JobManager(cli, max_workers=1)
+    uploads = [jobs.submit_upload("arduino:avr:uno", sketch, "/dev/ttyACM0") for _ in range(3)]
+    compile_job = jobs.submit_compile("arduino:avr:uno", sketch)
+    wait_done(compile_job, *uploads)
+
+    assert [job.status for job in uploads] == ["succeeded"] * 3
+    assert uploads[0].finished <= uploads[1].started and uploads[1].finished <= uploads[2].started
+    # The compile got the only worker while the other uploads waited for the port.
+    assert compile_job.status == "succeeded"
+    assert compile_job.finished <= uploads[1].started
+    assert "Waiting for another upload" in "".join(uploads[1].lines)
+
+
+def test_cancelled_queued_upload_does_not_block_the_port(cli, sketch):
+    jobs = JobManager(cli, max_workers=2)
+    first = jobs.submit_upload("arduino:avr:uno", sketch, "/dev/ttyACM0")
+    queued = jobs.submit_upload("arduino:avr:uno", sketch, "/dev/ttyACM0")
+    jobs.cancel(queued.id)
+    last = jobs.submit_upload("arduino:avr:uno", sketch, "/dev/ttyACM0")
+    wait_done(first, queued, last)
+    assert [first.status, queued.status, last.status] == ["succeeded", "cancelled", "succeeded"]
+
+
+def test_identical_queued_compiles_run_the_toolchain_once(cli, sketch, tmp_path):
+    jobs = JobManager(cli, max_workers=2, build_cache=BuildCache(tmp_path / "cache"))
+    first = jobs.submit_compile("arduino:avr:uno", sketch)
+    second = jobs.submit_compile("arduino:avr:uno", sketch)
+    wait_done(first, second)
+    assert first.status == second.status == "succeeded"
+    assert sorted([first.params["cached"], second.params["cached"]]) == [False, True]
+    assert (jobs.build_cache.hits, jobs.build_cache.misses) == (1, 1)
+
+
+def test_failed_cache_store_does_not_fail_the_build(cli, sketch, tmp_path, monkeypatch):
+    jobs = JobManager(cli, build_cache=BuildCache(tmp_path / "cache"))
+
+    def store(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(jobs.build_cache, "store", store)
+    job = jobs.submit_compile("arduino:avr:uno", sketch)
+    wait_done(job)
+    assert job.status == "succeeded"
+    assert job.params["cache_error"] == "No space left on device"
+
+
+def overlap(jobs):
+    """Most jobs that were running at the same moment."""
+    edges = sorted([(job.started, 1) for job in jobs] + [(job.finished, -1) for job in jobs], key=lambda e: (e[0], e[1]))
+    running = peak = 0
+    for _, change in edges:
+        running += change
+        peak = max(peak, running)
+    return peak
+
+
+def test_matrix_shares_the_pool_with_other_compiles(cli, sketch, monkeypatch):
+    monkeypatch.setattr(jobs_module.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(jobs_module, "available_memory", lambda: None)
+    jobs = JobManager(cli, max_workers=2)
+    matrix = jobs.submit_matrix(sketch, ["arduino:avr:uno", "arduino:avr:nano", "arduino:avr:mega"])
+    single = jobs.submit_compile("arduino:avr:leonardo", sketch)
+    wait_done(matrix, single)
+    assert matrix.status == "succeeded" and len(matrix.params["results"]) == 3
+    assert overlap(matrix.children + [single]) <= 2
+
+
+def test_matrix_parallelism_follows_memory_at_submission(cli, sketch, monkeypatch):
+    monkeypatch.setattr(jobs_module.os, "cpu_count", lambda: 4)
+    jobs = JobManager(cli, max_workers=4)
+    monkeypatch.setattr(jobs_module, "available_memory", lambda: jobs_module.BUILD_MEMORY_BYTES)
+    matrix = jobs.submit_matrix(sketch, ["arduino:avr:uno", "arduino:avr:nano", "arduino:avr:mega"])
+    wait_done(matrix)
+    assert matrix.status == "succeeded"
+    assert overlap(matrix.children) == 1
+
+
+def histogram_count(histogram, **labels):
+    key = ",".join(f'{name}="{labels[name]}"' for name in histogram.labelnames)
+    for sample in histogram.samples():
+        if sample.startswith(f"{histogram.name}_count{{{key}}} "):
+            return int(sample.split()[-1])
+    return 0
+
+
+def test_streamed_commands_record_latency_bytes_and_errors(cli, sketch):
+    seconds = histogram_count(COMMAND_SECONDS, command="compile", backend="subprocess")
+    output = OUTPUT_BYTES.value(command="compile")
+    errors = COMMAND_ERRORS.value(command="compile")
+
+    job = JobManager(cli).submit_compile("arduino:avr:uno", sketch)
+    wait_done(job)
+    assert histogram_count(COMMAND_SECONDS, command="compile", backend="subprocess") == seconds + 1
+    assert OUTPUT_BYTES.value(command="compile") == output + len("".join(job.lines))
+    assert COMMAND_ERRORS.value(command="compile") == errors
+
+    failing = JobManager(ArduinoCLI(cli_path="false")).submit_compile("arduino:avr:uno", sketch)
+    wait_done(failing)
+    assert failing.status == "failed"
+    assert COMMAND_ERRORS.value(command="compile") == errors + 1
+
+
+def test_upload_flashes_the_cached_build(cli, sketch, tmp_path):
+    jobs = JobManager(cli, build_cache=BuildCache(tmp_path / "cache"))
+    compile_job = jobs.submit_compile("arduino:avr:uno", sketch)
+    wait_done(compile_job)
+    result_dir = jobs.build_cache.artifact_dir(compile_job.params["cache_key"])
+    assert compile_job.params["artifacts"] == ["Blink.ino.hex"]
+
+    upload = jobs.submit_upload("arduino:avr:uno", sketch, "/dev/ttyACM0")
+    wait_done(upload)
+    assert upload.status == "succeeded"
+    assert upload.params["input_dir"] == result_dir.as_posix()
+    assert f"Uploading {result_dir.as_posix()}" in "".join(upload.lines)
+
+
+def test_upload_after_an_edit_uses_the_build_directory(cli, sketch, tmp_path):
+    jobs = JobManager(cli, build_cache=BuildCache(tmp_path / "cache"))
+    wait_done(jobs.submit_compile("arduino:avr:uno", sketch))
+    with open(f"{sketch}/Blink.ino", "a") as source:
+        source.write("// not compiled yet\n")
+
+    upload = jobs.submit_upload("arduino:avr:uno", sketch, "/dev/ttyACM0")
+    wait_done(upload)
+    assert upload.params["input_dir"] == jobs.build_cache.build_path(sketch, "arduino:avr:uno").as_posix()
+
+
+def test_upload_without_a_build_cache_uses_the_default_path(cli, sketch):
+    upload = JobManager(cli).submit_upload("arduino:avr:uno", sketch, "/dev/ttyACM0")
+    wait_done(upload)
+    assert upload.status == "succeeded" and "input_dir" not in upload.params
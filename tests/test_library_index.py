@@ -0,0 +1,41 @@
+import json
+import os
+
+from library_index import LibraryIndex
+
+
+def write_index(path, names, mtime):
+    releases = [{"name": name, "version": "1.0.0", "author": "Test", "sentence": f"{name} driver"} for name in names]
+    path.write_text(json.dumps({"libraries": releases}), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_search_ranks_name_matches_first(tmp_path):
+    path = tmp_path / "library_index.json"
+    write_index(path, ["Servo", "ServoEasing", "Adafruit PWM Servo Driver", "Stepper"], 1000)
+    index = LibraryIndex(path)
+    assert index.available()
+    result = index.search("servo")
+    assert [lib["name"] for lib in result["libraries"]][:2] == ["Servo", "ServoEasing"]
+    assert result["total"] == 3
+    assert index.search("serv", per_page=1, page=2)["libraries"][0]["name"] == "ServoEasing"
+
+
+def test_rebuild_during_a_search_does_not_mix_indexes(tmp_path, monkeypatch):
+    path = tmp_path / "library_index.json"
+    write_index(path, [f"Lib{i:03d}" for i in range(200)], 1000)
+    index = LibraryIndex(path)
+    index.available()
+
+    token_scores = index._token_scores
+
+    def rebuild_mid_query(*args):
+        # The index file shrinks and is reloaded while this query runs.
+        write_index(path, ["Lib000"], 2000)
+        index.available()
+        return token_scores(*args)
+
+    monkeypatch.setattr(index, "_token_scores", rebuild_mid_query)
+    result = index.search("lib199")
+    assert [lib["name"] for lib in result["libraries"]] == ["Lib199"]
+    assert len(index.libraries) == 1
@@ -0,0 +1,19 @@
+def test_failed_data_path_lookup_is_remembered(app, client, monkeypatch):
+    monkeypatch.setattr(app, "DATA_PATH", None)
+    monkeypatch.setattr(app, "_data_path_looked_up", False)
+    execute = app.cli._execute
+    commands = []
+
+    def failing_config(command, parse_json=False):
+        commands.append(command[:2])
+        if command[:2] == ["config", "get"]:
+            return {"error": True, "message": "no config"}
+        return execute(command, parse_json)
+
+    monkeypatch.setattr(app.cli, "_execute", failing_config)
+    for _ in range(3):
+        response = client.get("/api/libraries/search?query=servo")
+        assert response.status_code == 200
+        assert response.get_json()["libraries"][0]["name"] == "servo"  # From `lib search`.
+    assert commands.count(["config", "get"]) == 1
+    assert commands.count(["lib", "search"]) == 3
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+
+from arduino_cli import PROCESS_SPAWNS
+from metadata_cache import MetadataCache
+
+
+class Loader:
+    """Counts calls; optionally blocks each call until `release` is set."""
+
+    def __init__(self, result=None, block=False):
+        self.result = result if result is not None else {"boards": []}
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return {**self.result, "call": self.calls}
+
+
+def test_hits_until_the_ttl_expires():
+    cache = MetadataCache(ttl=0.1)
+    loader = Loader()
+    first = cache.get("boards", loader)
+    assert cache.get("boards", loader) is first
+    time.sleep(0.15)
+    assert cache.get("boards", loader).data["call"] == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache = MetadataCache()
+    loader = Loader(block=True)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("boards", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    loader.started.wait(5)
+    time.sleep(0.05)  # Let the other threads join the flight.
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1
+    assert len({id(entry) for entry in results}) == 1
+
+
+@pytest.mark.parametrize("keys", [("boards",), ()])
+def test_load_started_before_an_invalidation_is_not_stored(keys):
+    cache = MetadataCache()
+    loader = Loader(block=True)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(cache.get("boards", loader)))
+    thread.start()
+    loader.started.wait(5)
+    cache.invalidate(*keys)  # e.g. a core install finishing mid-load
+    loader.release.set()
+    thread.join()
+
+    assert result[0].data["call"] == 1  # The caller still gets its answer...
+    assert cache.get("boards", loader).data["call"] == 2  # ...but it isn't cached.
+    assert cache.get("boards", loader).data["call"] == 2
+
+
+def test_invalidate_drops_only_the_given_keys():
+    cache = MetadataCache()
+    boards, cores = Loader(), Loader()
+    cache.get("boards", boards)
+    cache.get("cores", cores)
+    cache.invalidate("boards")
+    cache.get("boards", boards)
+    cache.get("cores", cores)
+    assert (boards.calls, cores.calls) == (2, 1)
+
+
+def test_errors_are_not_cached():
+    cache = MetadataCache()
+    loader = Loader({"error": True, "message": "busy"})
+    cache.get("boards", loader)
+    cache.get("boards", loader)
+    assert loader.calls == 2
+
+
+def test_loader_exceptions_reach_every_waiter():
+    cache = MetadataCache()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("cli crashed")
+
+    errors = []
+
+    def get():
+        try:
+            cache.get("boards", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3
+    assert cache.get("boards", Loader()).data["call"] == 1
+
+
+def test_etag_follows_the_content():
+    cache = MetadataCache(ttl=0)
+    assert cache.get("a", lambda: {"x": 1}).etag == cache.get("b", lambda: {"x": 1}).etag
+    assert cache.get("a", lambda: {"x": 2}).etag != cache.get("b", lambda: {"x": 1}).etag
+
+
+def test_listing_route_answers_304_for_a_matching_etag(client):
+    response = client.get("/api/cores/installed")
+    assert response.status_code == 200 and response.headers["ETag"]
+    assert "no-cache" in response.headers["Cache-Control"]
+
+    spawns = PROCESS_SPAWNS.value(command="core list")
+    cached = client.get("/api/cores/installed", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304 and cached.data == b""
+    assert PROCESS_SPAWNS.value(command="core list") == spawns  # Served from the cache.
+
+    assert client.get("/api/cores/installed", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_installs_invalidate_the_listing(app, client):
+    client.get("/api/cores/installed")
+    spawns = PROCESS_SPAWNS.value(command="core list")
+    app.cli.core_install("arduino:avr")
+    assert client.get("/api/cores/installed").status_code == 200
+    assert PROCESS_SPAWNS.value(command="core list") == spawns + 1
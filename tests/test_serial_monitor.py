@@ -0,0 +1,138 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("serial")
+pty = pytest.importorskip("pty")
+
+from serial_monitor import SerialMonitor, Subscription  # noqa: E402
+
+
+@pytest.fixture
+def device():
+    """A pseudo-terminal standing in for a board: write to `master`, monitor `port`."""
+    master, slave = pty.openpty()
+    yield master, os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+@pytest.fixture
+def monitor():
+    monitor = SerialMonitor()
+    yield monitor
+    for port, reader in list(monitor._readers.items()):
+        reader.stop()
+
+
+def collect(subscription, until, timeout=5.0):
+    """Batches from `subscription` until `until(frames)` holds; returns (batches, frames)."""
+    batches, frames = [], []
+    deadline = time.monotonic() + timeout
+    while not until(frames):
+        assert time.monotonic() < deadline, f"timed out with {frames}"
+        batch = subscription.next_batch(timeout=0.5)
+        if batch:
+            batches.append(batch)
+            frames.extend(batch)
+    return batches, frames
+
+
+def text(frames):
+    return "".join(frame["data"] for frame in frames if frame["type"] == "data")
+
+
+def statuses(frames):
+    return [frame["message"] for frame in frames if frame["type"] == "status"]
+
+
+def opened(frames):
+    return any("opened" in message for message in statuses(frames))
+
+
+def test_output_fans_out_in_batches(device, monitor):
+    master, port = device
+    first = monitor.subscribe(port, 115200)
+    second = monitor.subscribe(port, 115200)
+    collect(first, opened)
+    collect(second, opened)
+
+    lines = "".join(f"line {i}\n" for i in range(50))
+    os.write(master, lines.encode())
+    for subscription in (first, second):
+        batches, frames = collect(subscription, lambda frames: text(frames) == lines)
+        assert len(batches) < 5  # Bursts go out as a few messages, not one per read.
+    assert len(monitor._readers) == 1  # Both clients share one reader.
+
+
+def test_slow_client_loses_oldest_output(device, monitor):
+    master, port = device
+    fast = monitor.subscribe(port, 115200)
+    collect(fast, opened)
+    slow = Subscription(max_bytes=1024)
+    monitor._readers[port].subscribe(slow)
+    collect(slow, opened)
+
+    data = b"".join(b"%05d\n" % i for i in range(1000))  # 6000 bytes against a 1024 byte budget.
+    os.write(master, data)
+    collect(fast, lambda frames: text(frames) == data.decode())
+
+    _, frames = collect(slow, lambda frames: any("dropped" in message for message in statuses(frames)))
+    received = text(frames)
+    dropped = sum(int(message.split()[0]) for message in statuses(frames) if "dropped" in message)
+    assert dropped > 0 and dropped + len(received) == len(data)
+    assert data.decode().endswith(received)  # The newest output is what survives.
+
+
+def test_upload_pauses_and_resumes_the_port(device, monitor):
+    master, port = device
+    subscription = monitor.subscribe(port, 115200)
+    collect(subscription, opened)
+    reader = monitor._readers[port]
+
+    with monitor.released(port):
+        assert reader._serial is None
+        _, frames = collect(subscription, lambda frames: any("released" in message for message in statuses(frames)))
+
+    collect(subscription, opened)
+    os.write(master, b"after upload\n")
+    collect(subscription, lambda frames: "after upload\n" in text(frames))
+
+
+def test_last_unsubscribe_stops_the_reader(device, monitor):
+    _, port = device
+    subscription = monitor.subscribe(port, 115200)
+    collect(subscription, opened)
+    reader = monitor._readers[port]
+    monitor.unsubscribe(port, subscription)
+    assert port not in monitor._readers
+    assert not reader._thread.is_alive() and reader._serial is None
+
+
+def test_reader_created_during_an_upload_waits_for_it(device, monitor):
+    master, port = device
+    first = monitor.subscribe(port, 115200)
+    collect(first, opened)
+
+    with monitor.released(port):
+        monitor.unsubscribe(port, first)  # The last client leaves mid-upload...
+        second = monitor.subscribe(port, 115200)  # ...and a new one arrives.
+        time.sleep(0.3)
+        assert monitor._readers[port]._serial is None
+        _, frames = collect(second, lambda frames: statuses(frames))
+        assert not opened(frames) and "busy" in statuses(frames)[0]
+
+    collect(second, opened)
+    os.write(master, b"after upload\n")
+    collect(second, lambda frames: "after upload\n" in text(frames))
+
+
+def test_released_without_a_reader(device, monitor):
+    _, port = device
+    with monitor.released(port):
+        subscription = monitor.subscribe(port, 115200)
+        time.sleep(0.2)
+        assert monitor._readers[port]._serial is None
+    collect(subscription, opened)
+    assert monitor._released == {}
@@ -0,0 +1,171 @@
+import pytest
+
+from workspace import StaleWriteError, apply_patches, atomic_write, file_version, save_file
+
+
+def patch(start, end, text=""):
+    return {"start": start, "end": end, "text": text}
+
+
+def test_patches_use_offsets_of_the_original_text():
+    text = "void setup() {}\nvoid loop() {}\n"
+    patches = [patch(5, 10, "begin"), patch(21, 25, "step"), patch(0, 0, "// blink\n")]
+    assert apply_patches(text, patches) == "// blink\nvoid begin() {}\nvoid step() {}\n"
+
+
+def test_patches_may_touch_the_ends_of_the_text():
+    assert apply_patches("abc", [patch(0, 1, "A"), patch(3, 3, "!")]) == "Abc!"
+    assert apply_patches("abc", [patch(0, 3)]) == ""
+    assert apply_patches("", [patch(0, 0, "new")]) == "new"
+
+
+def test_inserts_at_the_same_offset_keep_their_order():
+    assert apply_patches("abc", [patch(1, 1, "x"), patch(1, 1, "y")]) == "axybc"
+    assert apply_patches("abc", [patch(1, 1, "y"), patch(1, 1, "x")]) == "ayxbc"
+    # Inserts go ahead of a range replaced from the same offset, whatever the list order.
+    assert apply_patches("abc", [patch(1, 2, "B"), patch(1, 1, "x")]) == "axBc"
+
+
+def test_adjacent_ranges_are_allowed():
+    assert apply_patches("abcd", [patch(0, 2, "X"), patch(2, 4, "Y")]) == "XY"
+
+
+@pytest.mark.parametrize("patches", [
+    [patch(0, 2), patch(1, 3)],
+    [patch(0, 4), patch(1, 2)],
+    [patch(1, 3), patch(2, 2, "x")],
+])
+def test_overlapping_ranges_are_rejected(patches):
+    with pytest.raises(ValueError, match="overlap"):
+        apply_patches("abcd", patches)
+
+
+@pytest.mark.parametrize("start, end", [(-1, 0), (2, 1), (0, 5)])
+def test_ranges_outside_the_text_are_rejected(start, end):
+    with pytest.raises(ValueError, match="outside the file"):
+        apply_patches("abcd", [patch(start, end)])
+
+
+def test_offsets_count_utf16_code_units():
+    # The emoji is one code point but two UTF-16 units, as in a JavaScript string.
+    text = "a\U0001F600b"
+    assert apply_patches(text, [patch(3, 4, "c")]) == "a\U0001F600c"
+    assert apply_patches(text, [patch(1, 3, ":)")]) == "a:)b"
+    with pytest.raises(ValueError, match="outside the file"):
+        apply_patches(text, [patch(0, 5)])
+
+
+def test_a_split_surrogate_pair_must_be_rejoined():
+    text = "a\U0001F600b"
+    # Replacing the low surrogate alone with the same unit leaves the pair intact.
+    assert apply_patches(text, [patch(2, 3, "\ude00")]) == text
+    with pytest.raises(ValueError):
+        apply_patches(text, [patch(2, 3, "x")])
+
+
+def test_save_file_checks_the_base_version(tmp_path):
+    path = tmp_path / "sketch.ino"
+    path.write_text("abc")
+    version = file_version(b"abc")
+
+    new_version = save_file(path, version, patches=[patch(3, 3, "d")])
+    assert path.read_text() == "abcd"
+    assert new_version == file_version(b"abcd")
+
+    with pytest.raises(StaleWriteError) as error:
+        save_file(path, version, content="lost update")
+    assert error.value.current_version == new_version
+    assert path.read_text() == "abcd"
+
+
+def test_save_file_without_base_version_overwrites(tmp_path):
+    path = tmp_path / "sketch.ino"
+    path.write_text("abc")
+    assert save_file(path, content="new") == file_version(b"new")
+    assert path.read_text() == "new"
+    with pytest.raises(ValueError, match="base_version"):
+        save_file(path, patches=[patch(0, 0, "x")])
+
+
+def test_atomic_write_keeps_mode_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "sketch.ino"
+    path.write_text("old")
+    path.chmod(0o640)
+    atomic_write(path, b"new")
+    assert path.read_bytes() == b"new"
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in tmp_path.iterdir()] == ["sketch.ino"]
+
+
+# =================== Routes ===================
+
+@pytest.fixture
+def sketch(sketchbook):
+    folder = sketchbook / "Workspace"
+    folder.mkdir(exist_ok=True)
+    for old in folder.iterdir():
+        old.unlink()
+    (folder / "Workspace.ino").write_text("void setup() {}\n")
+    (folder / "notes.h").write_text("// notes\n")
+    return folder
+
+
+def test_workspace_answers_304_until_a_file_changes(client, sketch):
+    url = f"/api/sketch/workspace?path={sketch}"
+    response = client.get(url)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [f["name"] for f in body["files"]] == ["Workspace.ino", "notes.h"]
+    etag = response.headers["ETag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    (sketch / ".notes.h.123.tmp").write_text("in-flight write")
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    (sketch / "notes.h").write_text("// changed\n")
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_workspace_rejects_paths_outside_the_sketchbook(client, sketchbook):
+    assert client.get(f"/api/sketch/workspace?path={sketchbook.parent}").status_code == 403
+
+
+def test_patch_route_saves_and_rejects_stale_versions(client, sketch):
+    path = sketch / "Workspace.ino"
+    version = file_version(path.read_bytes())
+    response = client.patch("/api/sketch/file/content", json={
+        "path": str(path), "base_version": version, "patches": [patch(5, 10, "begin")],
+    })
+    assert response.status_code == 200
+    assert path.read_text() == "void begin() {}\n"
+    assert response.get_json()["version"] == file_version(path.read_bytes())
+
+    response = client.patch("/api/sketch/file/content", json={
+        "path": str(path), "base_version": version, "patches": [patch(0, 0, "x")],
+    })
+    assert response.status_code == 409
+    assert response.get_json()["version"] == file_version(path.read_bytes())
+    assert path.read_text() == "void begin() {}\n"
+
+
+@pytest.mark.parametrize("body", [
+    {},  # No patches.
+    {"patches": {"start": 0, "end": 0}},  # Not a list.
+    {"patches": [patch(0, 0, "x")], "base_version": None},  # No base version.
+    {"patches": [patch(0, 99)]},  # Out of range.
+    {"patches": [patch(0, 4), patch(2, 6)]},  # Overlapping.
+    {"patches": [{"start": 0}]},  # Missing end.
+    {"patches": [patch(0, "x")]},  # Not an offset.
+    {"patches": ["not a patch"]},
+])
+def test_patch_route_rejects_bad_patches(client, sketch, body):
+    path = sketch / "Workspace.ino"
+    original = path.read_text()
+    body = {"path": str(path), "base_version": file_version(path.read_bytes()), **body}
+    response = client.patch("/api/sketch/file/content", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"] is True
+    assert path.read_text() == original
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+_path_locks = defaultdict(threading.Lock)
+_path_locks_guard = threading.Lock()
+
+
+class StaleWriteError(Exception):
+    """The file changed since the version the client based its edit on."""
+
+    def __init__(self, current_version):
+        super().__init__("File has changed since it was loaded.")
+        self.current_version = current_version
+
+
+def file_version(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_workspace(sketch_path):
+    """
+    Every file directly inside a sketch folder with its size, mtime, content
+    hash (`version`) and text, plus a `version` covering the whole set.
+    """
+    files = []
+    for file_path in sorted(Path(sketch_path).iterdir()):
+        # Hidden files include in-flight atomic_write temp files.
+        if not file_path.is_file() or file_path.name.startswith("."):
+            continue
+        data = file_path.read_bytes()
+        stat = file_path.stat()
+        files.append({
+            "name": file_path.name,
+            "path": file_path.as_posix(),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "version": file_version(data),
+            "content": data.decode("utf-8", errors="replace"),
+        })
+    combined = "".join(f"{f['name']}\0{f['version']}\0" for f in files)
+    return {"path": Path(sketch_path).as_posix(), "version": file_version(combined.encode("utf-8")), "files": files}
+
+
+def apply_patches(text, patches):
+    """
+    Applies [{"start", "end", "text"}] replacements to `text`. Offsets refer to
+    the original text and count UTF-16 code units, like JavaScript string
+    indices, so editor offsets can be sent as-is. Ranges must not overlap;
+    inserts at the same offset land in the order given, ahead of a range
+    replaced from that offset. A patch may split a surrogate pair as long as
+    the result rejoins it.
+    """
+    units = text.encode("utf-16-le")
+    length = len(units) // 2
+    previous_start = length
+    # Applied back to front so earlier offsets stay valid; the list index
+    # keeps same-offset inserts in their given order.
+    ordered = sorted(enumerate(patches), key=lambda p: (int(p[1]["start"]), int(p[1]["end"]), p[0]), reverse=True)
+    for _, patch in ordered:
+        start, end = int(patch["start"]), int(patch["end"])
+        if not 0 <= start <= end <= length:
+            raise ValueError(f"Patch range {start}-{end} is outside the file (length {length}).")
+        if end > previous_start:
+            raise ValueError("Patch ranges overlap.")
+        units = units[:start * 2] + str(patch.get("text", "")).encode("utf-16-le", "surrogatepass") + units[end * 2:]
+        previous_start = start
+    return units.decode("utf-16-le")
+
+
+def atomic_write(file_path, data):
+    """Writes bytes to a temp file next to `file_path` and renames it into place."""
+    file_path = Path(file_path)
+    fd, tmp_name = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        if file_path.exists():
+            os.chmod(tmp_name, file_path.stat().st_mode & 0o777)
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def save_file(file_path, base_version=None, content=None, patches=None):
+    """
+    Saves a file from full `content` or `patches` against its current text.
+    With `base_version` (required for patches) the write is rejected with
+    StaleWriteError if the file no longer has that version. Returns the new version.
+    """
+    file_path = Path(file_path)
+    with _path_locks_guard:
+        lock = _path_locks[file_path.resolve()]
+    with lock:
+        current = file_path.read_bytes() if file_path.exists() else b""
+        current_version = file_version(current)
+        if base_version is not None and base_version != current_version:
+            raise StaleWriteError(current_version)
+        if patches is not None:
+            if base_version is None:
+                raise ValueError("Patches require the base_version they were computed against.")
+            content = apply_patches(current.decode("utf-8"), patches)
+        data = (content or "").encode("utf-8")
+        atomic_write(file_path, data)
+        return file_version(data)